@@ -0,0 +1,502 @@
+"""Atlona Telnet broker.
+
+An Atlona matrix only handles one Telnet session well. The broker holds that
+session and shares it with any number of clients (Home Assistant, scripts,
+other control systems) on its own port (2323 by default):
+
+- Commands from all clients are queued onto the one matrix session and
+  pipelined: they are written as they arrive and replies are matched back in
+  order, so concurrent clients never wait on each other's round-trips.
+- Read commands (Status, PWSTA, x{n}$ sta, Type, ...) are answered from a
+  short-TTL cache, and identical reads in flight are sent to the matrix once.
+  Any write or state feedback clears the cache.
+- State feedback no command is waiting for (front panel, IR, other control
+  systems) is broadcast to every client, and accepted writes are echoed to
+  the other clients, so everyone sees every state change.
+- BROKER:STATUS returns the broker state as JSON, BROKER:WAIT blocks until
+  the matrix session is up. Failures reply with an "ERROR: ..." line.
+
+Standalone, standard library only:
+
+    python3 broker.py 192.168.1.50 --port 2323
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import deque
+from typing import Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PORT = 2323
+DEFAULT_MATRIX_PORT = 23
+
+# Number of reply lines per command; anything not listed replies with one line
+REPLY_LINES = {
+    "Status": 2,  # video routing line + audio routing line
+}
+
+# Read-only queries that may be served from the cache
+CACHEABLE = re.compile(r"^(Status|PWSTA|Type|Version|show_host_name|x\d+\$ sta)$")
+CACHE_TTL = 1.0
+
+# Seconds to wait for the first reply line, and the quiet period that ends a
+# reply shorter than REPLY_LINES
+REPLY_TIMEOUT = 5.0
+REPLY_IDLE = 0.3
+
+# Quiet period that ends the login banner/prompt output of the matrix
+LOGIN_IDLE = 0.5
+
+# Reconnect backoff (seconds) for the matrix session
+RETRY_MIN = 1.0
+RETRY_MAX = 30.0
+
+# Telnet negotiation bytes (RFC 854)
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+
+_POWER_COMMAND = re.compile(r"^(x\d+\$)")
+
+# Telnet login prompts and failure message (same as the integration's direct
+# transport)
+_LOGIN_PROMPT = re.compile(rb"(login|user\s*name|user)\s*:\s*$", re.IGNORECASE)
+_PASSWORD_PROMPT = re.compile(rb"password\s*:\s*$", re.IGNORECASE)
+_LOGIN_FAILED = re.compile(rb"fail|incorrect|invalid|denied", re.IGNORECASE)
+
+# Unsolicited state feedback (same shapes as Atlona-Matrix/protocol.py): route
+# changes, output power and master power
+_FEEDBACK = (
+    re.compile(r"^x(\d+)(AV|V|A)x(\d+(?:,x?\d+)*)$", re.IGNORECASE),
+    re.compile(r"^x(\d+)\$ (on|off)$", re.IGNORECASE),
+    re.compile(r"^PW(ON|OFF)$", re.IGNORECASE),
+)
+
+
+def _is_feedback(line: str) -> bool:
+    """Return True if a line looks like unsolicited state feedback."""
+    return any(pattern.match(line) for pattern in _FEEDBACK)
+
+
+def _strip_telnet(data: bytes) -> tuple:
+    """Remove Telnet negotiation from matrix output.
+
+    Returns (text, answers, tail): every option the matrix offers or asks
+    for is refused, and an incomplete sequence at the end is returned as
+    tail to be prepended to the next chunk.
+    """
+    text = bytearray()
+    answers = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte != IAC:
+            text.append(byte)
+            i += 1
+            continue
+        if i + 1 >= len(data):
+            return bytes(text), bytes(answers), data[i:]
+        verb = data[i + 1]
+        if verb == IAC:
+            text.append(IAC)
+            i += 2
+        elif verb in (DO, DONT, WILL, WONT):
+            if i + 2 >= len(data):
+                return bytes(text), bytes(answers), data[i:]
+            if verb in (DO, WILL):
+                answers += bytes((IAC, WONT if verb == DO else DONT, data[i + 2]))
+            i += 3
+        elif verb == SB:
+            end = data.find(bytes((IAC, SE)), i + 2)
+            if end < 0:
+                return bytes(text), bytes(answers), data[i:]
+            i = end + 2
+        else:
+            i += 2
+    return bytes(text), bytes(answers), b""
+
+
+def _expects(command: str, line: str) -> bool:
+    """Return True if a feedback-shaped line is the reply to `command`."""
+    if command.startswith("PW"):
+        return line.startswith("PW")
+    match = _POWER_COMMAND.match(command)
+    if match:
+        return line.startswith(match.group(1))
+    # Route commands are echoed back verbatim
+    return line.lower() == command.lower()
+
+
+class _Pending:
+    """A command written to the matrix, waiting for its reply lines."""
+
+    __slots__ = ("command", "wanted", "lines", "future")
+
+    def __init__(self, command: str):
+        self.command = command
+        self.wanted = REPLY_LINES.get(command, 1)
+        self.lines = []
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class MatrixSession:
+    """The broker's single Telnet session to the matrix."""
+
+    def __init__(self, host: str, port: int = DEFAULT_MATRIX_PORT,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 cache_ttl: float = CACHE_TTL):
+        self.host = host
+        self.port = port
+        self._username = username
+        self._password = password
+        self._cache_ttl = cache_ttl
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._cache = {}
+        self._reads = {}
+        # Bumped whenever state may have changed; a read issued before the
+        # change is not cached
+        self._generation = 0
+        self._listeners = []
+        self.connected = asyncio.Event()
+        self.stats = {
+            "commands": 0,
+            "cache_hits": 0,
+            "errors": 0,
+            "feedback": 0,
+            "reconnects": 0,
+        }
+
+    def add_listener(self, listener):
+        """Register a callback for unsolicited lines; returns a remover."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    @property
+    def queued(self) -> int:
+        return len(self._pending)
+
+    async def run(self):
+        """Hold the matrix session, reconnecting with backoff, until cancelled."""
+        backoff = RETRY_MIN
+        while True:
+            try:
+                reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), timeout=REPLY_TIMEOUT
+                )
+                await self._login(reader)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                _LOGGER.warning(f"Matrix connect to {self.host}:{self.port} failed: {e}")
+                self._close()
+            else:
+                _LOGGER.info(f"Connected to matrix at {self.host}:{self.port}")
+                self.connected.set()
+                opened = time.monotonic()
+                await self._read_loop(reader)
+                _LOGGER.warning("Matrix session closed")
+                self._close()
+                self.stats["reconnects"] += 1
+                if time.monotonic() - opened > RETRY_MAX:
+                    backoff = RETRY_MIN
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RETRY_MAX)
+
+    async def _login(self, reader: asyncio.StreamReader):
+        """Refuse Telnet options, answer the login prompts, swallow the banner.
+
+        Returns once the matrix has gone quiet, so nothing it printed during
+        login is taken as the reply to a client command.
+        """
+        text = await self._read_prompt(reader)
+        if _LOGIN_PROMPT.search(text.rstrip()):
+            if not self._username:
+                raise ConnectionRefusedError("matrix requires a Telnet login")
+            self._writer.write(f"{self._username}\r\n".encode())
+            text = await self._read_prompt(reader)
+        if _PASSWORD_PROMPT.search(text.rstrip()):
+            self._writer.write(f"{self._password or ''}\r\n".encode())
+            text = await self._read_prompt(reader)
+        if _LOGIN_FAILED.search(text):
+            raise ConnectionRefusedError(f"matrix Telnet login failed: {text.strip()!r}")
+        await self._writer.drain()
+
+    async def _read_prompt(self, reader: asyncio.StreamReader) -> bytes:
+        """Read matrix output until it prompts or goes quiet (LOGIN_IDLE)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + REPLY_TIMEOUT
+        text = b""
+        tail = b""
+        while loop.time() < deadline:
+            try:
+                data = await asyncio.wait_for(reader.read(4096), timeout=LOGIN_IDLE)
+            except asyncio.TimeoutError:
+                break
+            if not data:
+                raise ConnectionResetError("matrix closed the connection during login")
+            data, answers, tail = _strip_telnet(tail + data)
+            if answers:
+                self._writer.write(answers)
+            text += data
+            if text.rstrip().endswith(b":"):
+                break
+        return text
+
+    def _close(self):
+        """Drop the session and fail everything still waiting on it."""
+        self.connected.clear()
+        if self._writer:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        self._writer = None
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            self._finish(self._pending.popleft(), ["ERROR: matrix disconnected"])
+        self._invalidate()
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        """Split matrix output into lines and dispatch them until it closes."""
+        buf = b""
+        tail = b""
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    return
+                text, answers, tail = _strip_telnet(tail + data)
+                if answers and self._writer:
+                    self._writer.write(answers)
+                buf += text
+                while b"\n" in buf:
+                    line, buf = buf.split(b"\n", 1)
+                    line = line.decode("utf-8", errors="ignore").strip()
+                    if line:
+                        self._dispatch(line)
+        except OSError as e:
+            _LOGGER.debug(f"Matrix read error: {e}")
+
+    def _dispatch(self, line: str):
+        """Hand a line to the oldest waiting command, or broadcast it."""
+        head = self._pending[0] if self._pending else None
+        if head and (not _is_feedback(line) or _expects(head.command, line)):
+            head.lines.append(line)
+            if len(head.lines) >= head.wanted:
+                self._finish(self._pending.popleft(), head.lines)
+            self._arm()
+            return
+
+        if not _is_feedback(line):
+            # Banners, prompts and replies that arrived after their timeout
+            _LOGGER.debug(f"Dropped matrix line: {line!r}")
+            return
+        self.stats["feedback"] += 1
+        self._invalidate()
+        self._broadcast(line)
+
+    def _invalidate(self):
+        """Forget cached replies and stop new reads joining older ones."""
+        self._cache.clear()
+        self._reads.clear()
+        self._generation += 1
+
+    def _broadcast(self, line: str, skip=None):
+        for listener in list(self._listeners):
+            if listener is skip:
+                continue
+            try:
+                listener(line)
+            except Exception:
+                _LOGGER.exception("Error in broker feedback listener")
+
+    def _arm(self):
+        """(Re)start the timer of the oldest waiting command."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            head = self._pending[0]
+            wait = REPLY_IDLE if head.lines else REPLY_TIMEOUT
+            self._timer = asyncio.get_running_loop().call_later(wait, self._expire)
+
+    def _expire(self):
+        """End a short reply after the idle gap, or a silent command."""
+        self._timer = None
+        if not self._pending:
+            return
+        head = self._pending.popleft()
+        if head.lines:
+            self._finish(head, head.lines)
+        else:
+            _LOGGER.warning(f"Matrix timeout for command: {head.command}")
+            self._finish(head, ["ERROR: timeout"])
+        self._arm()
+
+    def _finish(self, pending: _Pending, lines: list):
+        if lines and lines[0].startswith("ERROR:"):
+            self.stats["errors"] += 1
+        if not pending.future.done():
+            pending.future.set_result(lines)
+
+    async def request(self, command: str, source=None) -> list:
+        """Send one command to the matrix and return its reply lines.
+
+        `source` is the requesting client's feedback listener: an accepted
+        write is echoed to every other client.
+        """
+        self.stats["commands"] += 1
+        cacheable = CACHEABLE.match(command) is not None
+        if cacheable:
+            cached = self._cache.get(command)
+            if cached and cached[0] > time.monotonic():
+                self.stats["cache_hits"] += 1
+                return cached[1]
+            if command in self._reads:
+                self.stats["cache_hits"] += 1
+                return await asyncio.shield(self._reads[command])
+        else:
+            self._invalidate()
+
+        if self._writer is None:
+            self.stats["errors"] += 1
+            return ["ERROR: matrix not connected"]
+
+        generation = self._generation
+        pending = _Pending(command)
+        self._pending.append(pending)
+        self._writer.write(f"{command}\r\n".encode())
+        if len(self._pending) == 1:
+            self._arm()
+        if cacheable:
+            self._reads[command] = pending.future
+        try:
+            lines = await asyncio.shield(pending.future)
+        finally:
+            if cacheable and self._reads.get(command) is pending.future:
+                del self._reads[command]
+
+        if lines and not lines[0].startswith("ERROR:"):
+            if cacheable and generation == self._generation:
+                self._cache[command] = (time.monotonic() + self._cache_ttl, lines)
+            elif _is_feedback(lines[0]):
+                self._broadcast(lines[0], skip=source)
+        return lines
+
+
+class Broker:
+    """Telnet server that shares one MatrixSession between many clients."""
+
+    def __init__(self, session: MatrixSession):
+        self.session = session
+        self.clients = set()
+        self._started = time.monotonic()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one client: pipelined commands, replies in order, feedback pushed."""
+        peer = writer.get_extra_info("peername")
+        _LOGGER.info(f"Client connected: {peer}")
+
+        def send_lines(lines):
+            if not writer.is_closing():
+                writer.write("".join(f"{line}\r\n" for line in lines).encode())
+
+        def on_feedback(line):
+            send_lines([line])
+
+        replies = asyncio.Queue()
+        remove = self.session.add_listener(on_feedback)
+        sender = asyncio.get_running_loop().create_task(self._send_replies(replies, send_lines))
+        self.clients.add(writer)
+        try:
+            while line := await reader.readline():
+                command = line.decode("utf-8", errors="ignore").strip()
+                if command:
+                    replies.put_nowait(asyncio.ensure_future(self._execute(command, on_feedback)))
+            await replies.join()
+        except (OSError, asyncio.IncompleteReadError) as e:
+            _LOGGER.debug(f"Client {peer} read error: {e}")
+        finally:
+            remove()
+            sender.cancel()
+            self.clients.discard(writer)
+            writer.close()
+            _LOGGER.info(f"Client disconnected: {peer}")
+
+    async def _send_replies(self, replies: asyncio.Queue, send_lines):
+        """Write replies in the order their commands arrived."""
+        while True:
+            reply = await replies.get()
+            try:
+                send_lines(await reply)
+            finally:
+                replies.task_done()
+
+    async def _execute(self, command: str, source) -> list:
+        """Run a BROKER:* verb locally, or a matrix command on the session."""
+        verb = command.upper()
+        if verb == "BROKER:STATUS":
+            return [json.dumps(self.status())]
+        if verb.startswith("BROKER:WAIT"):
+            _, _, timeout = command.partition(" ")
+            try:
+                await asyncio.wait_for(
+                    self.session.connected.wait(), timeout=float(timeout or 30)
+                )
+            except (asyncio.TimeoutError, ValueError):
+                return ["ERROR: matrix not connected"]
+            return ["OK"]
+        if verb.startswith("BROKER:"):
+            return [f"ERROR: unknown broker command {command}"]
+        return await self.session.request(command, source)
+
+    def status(self) -> dict:
+        return {
+            "connected": self.session.connected.is_set(),
+            "matrix": f"{self.session.host}:{self.session.port}",
+            "clients": len(self.clients),
+            "queued": self.session.queued,
+            "uptime": round(time.monotonic() - self._started),
+            **self.session.stats,
+        }
+
+
+async def serve(args):
+    session = MatrixSession(
+        args.matrix_host, args.matrix_port, args.username, args.password, args.cache_ttl
+    )
+    broker = Broker(session)
+    server = await asyncio.start_server(broker.handle_client, args.host, args.port)
+    _LOGGER.info(f"Broker listening on {args.host}:{args.port}")
+    async with server:
+        await asyncio.gather(server.serve_forever(), session.run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share one Atlona matrix Telnet session")
+    parser.add_argument("matrix_host", help="IP address of the Atlona matrix")
+    parser.add_argument("--matrix-port", type=int, default=DEFAULT_MATRIX_PORT)
+    parser.add_argument("--username", help="Telnet login, if enabled on the matrix")
+    parser.add_argument("--password")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-ttl", type=float, default=CACHE_TTL,
+                        help="seconds read replies are served from cache")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
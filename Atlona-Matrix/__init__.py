@@ -1,18 +1,86 @@
 import asyncio
 import logging
 
+import voluptuous as vol
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall
+import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN, PLATFORMS
-from .coordinator import AtlonaDataUpdateCoordinator
+from .const import (
+    ATTR_ENTRY_ID,
+    ATTR_INPUT,
+    ATTR_OUTPUTS,
+    ATTR_POWER,
+    ATTR_ROUTES,
+    CONF_INPUT_COUNT,
+    CONF_INPUT_NAMES,
+    CONF_OUTPUT_COUNT,
+    CONF_OUTPUT_NAMES,
+    CONF_PASSWORD,
+    CONF_POLL_CEILING,
+    CONF_POLL_FLOOR,
+    CONF_TRANSPORT,
+    CONF_USERNAME,
+    DEFAULT_INPUT_NAMES,
+    DEFAULT_OUTPUT_NAMES,
+    DEFAULT_POLL_CEILING,
+    DEFAULT_POLL_FLOOR,
+    DOMAIN,
+    PLATFORMS,
+    SERVICE_APPLY_ROUTING,
+    SERVICE_ROUTE_INPUT,
+    TRANSPORT_DIRECT,
+)
+from .coordinator import AtlonaDataUpdateCoordinator, snapshot_store
+from .protocol import Topology
 
 _LOGGER = logging.getLogger(__name__)
 
+APPLY_ROUTING_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_ENTRY_ID): cv.string,
+    vol.Optional(ATTR_ROUTES, default={}): {vol.Coerce(int): vol.Coerce(int)},
+    vol.Optional(ATTR_POWER, default={}): {vol.Coerce(int): cv.boolean},
+})
+
+ROUTE_INPUT_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_ENTRY_ID): cv.string,
+    vol.Required(ATTR_INPUT): cv.positive_int,
+    vol.Required(ATTR_OUTPUTS): vol.All(cv.ensure_list, [cv.positive_int]),
+})
+
+
+def _target_coordinators(hass: HomeAssistant, call: ServiceCall) -> list:
+    """Return the coordinators a service call applies to (all if no entry_id)."""
+    coordinators = hass.data.get(DOMAIN, {})
+    entry_id = call.data.get(ATTR_ENTRY_ID)
+    if entry_id:
+        return [coordinators[entry_id]] if entry_id in coordinators else []
+    return list(coordinators.values())
+
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     hass.data.setdefault(DOMAIN, {})
+
+    async def async_apply_routing(call: ServiceCall) -> None:
+        for coordinator in _target_coordinators(hass, call):
+            await coordinator.async_apply_routing(
+                call.data[ATTR_ROUTES], call.data[ATTR_POWER]
+            )
+
+    async def async_route_input(call: ServiceCall) -> None:
+        for coordinator in _target_coordinators(hass, call):
+            await coordinator.async_route_input(
+                call.data[ATTR_INPUT], call.data[ATTR_OUTPUTS]
+            )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_APPLY_ROUTING, async_apply_routing, schema=APPLY_ROUTING_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_ROUTE_INPUT, async_route_input, schema=ROUTE_INPUT_SCHEMA
+    )
     return True
 
 
@@ -20,12 +88,50 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
     host = entry.data.get("host")
     port = entry.data.get("port", 23)
+    topology = None
+    if CONF_OUTPUT_COUNT in entry.data:
+        topology = Topology(entry.data.get(CONF_INPUT_COUNT), entry.data[CONF_OUTPUT_COUNT])
 
-    coordinator = AtlonaDataUpdateCoordinator(hass, host, port)
-    await coordinator.async_config_entry_first_refresh()
+    coordinator = AtlonaDataUpdateCoordinator(
+        hass,
+        host,
+        port,
+        entry.options.get(CONF_POLL_FLOOR, DEFAULT_POLL_FLOOR),
+        entry.options.get(CONF_POLL_CEILING, DEFAULT_POLL_CEILING),
+        entry.options.get(CONF_INPUT_NAMES, DEFAULT_INPUT_NAMES),
+        entry.options.get(CONF_OUTPUT_NAMES, DEFAULT_OUTPUT_NAMES),
+        topology,
+        direct=entry.data.get(CONF_TRANSPORT) == TRANSPORT_DIRECT,
+        username=entry.data.get(CONF_USERNAME),
+        password=entry.data.get(CONF_PASSWORD),
+        entry_id=entry.entry_id,
+    )
+
+    # Start from the state saved by the last run and refresh in the
+    # background; only the very first setup waits for the matrix
+    if await coordinator.async_restore():
+        async def async_first_refresh() -> None:
+            await coordinator.async_refresh()
+            if _cache_topology(hass, entry, coordinator, topology):
+                # Entities were created for the old size
+                hass.async_create_task(hass.config_entries.async_reload(entry.entry_id))
+
+        entry.async_create_background_task(
+            hass, async_first_refresh(), f"{DOMAIN}_first_refresh_{entry.entry_id}"
+        )
+    else:
+        await coordinator.async_config_entry_first_refresh()
+        _cache_topology(hass, entry, coordinator, topology)
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
+    # Hold a listening session (broker or matrix) for pushed route/power feedback
+    entry.async_create_background_task(
+        hass, coordinator.client.listen(), f"{DOMAIN}_listen_{entry.entry_id}"
+    )
+
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
+
     # FIX: Pass the list 'PLATFORMS' directly. Do not loop.
     # Also, simply await it; do not wrap in create_task.
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
@@ -33,6 +139,51 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+def _cache_topology(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: AtlonaDataUpdateCoordinator,
+    cached: Topology,
+) -> bool:
+    """Save a newly discovered matrix size in the entry; True if it changed.
+    
+    The next start then polls the right outputs from the first refresh.
+    """
+    if not coordinator.topology or coordinator.topology == cached:
+        return False
+    hass.config_entries.async_update_entry(
+        entry,
+        data={
+            **entry.data,
+            CONF_INPUT_COUNT: coordinator.topology.inputs,
+            CONF_OUTPUT_COUNT: coordinator.topology.outputs,
+        },
+    )
+    return True
+
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed polling bounds without reloading.
+    
+    Entities are named and created from the name maps, so a change to those
+    reloads the entry.
+    """
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    input_names = coordinator.input_names
+    output_names = coordinator.output_names
+    coordinator.set_names(
+        entry.options.get(CONF_INPUT_NAMES, DEFAULT_INPUT_NAMES),
+        entry.options.get(CONF_OUTPUT_NAMES, DEFAULT_OUTPUT_NAMES),
+    )
+    if (coordinator.input_names, coordinator.output_names) != (input_names, output_names):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    coordinator.set_poll_bounds(
+        entry.options.get(CONF_POLL_FLOOR, DEFAULT_POLL_FLOOR),
+        entry.options.get(CONF_POLL_CEILING, DEFAULT_POLL_CEILING),
+    )
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = all(
         await asyncio.gather(
@@ -40,5 +191,12 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         )
     )
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_shutdown()
+        await coordinator.client.close()
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the saved state of a removed entry."""
+    await snapshot_store(hass, entry.entry_id).async_remove()
@@ -0,0 +1,107 @@
+"""Micro-benchmark for the Atlona reply parsers.
+
+Checks every reply in replies.py against its expected parse, then times
+parse_status, parse_output_power, parse_master_power and parse_feedback over
+the corpus. Stdlib only; run from anywhere:
+
+    python Atlona-Matrix/benchmarks/bench_protocol.py [--number N]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import timeit
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
+
+import replies  # noqa: E402
+
+
+def _load_protocol():
+    """Import protocol.py on its own (the component needs Home Assistant)."""
+    spec = importlib.util.spec_from_file_location(
+        "atlona_protocol", os.path.join(os.path.dirname(_HERE), "protocol.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+protocol = _load_protocol()
+
+
+def _feedback_fields(change):
+    if isinstance(change, protocol.RouteChange):
+        return ("route", change.input, change.outputs, change.video, change.audio)
+    if isinstance(change, protocol.PowerRecord):
+        return ("power", change.output, change.on)
+    if isinstance(change, protocol.MasterPower):
+        return ("master", change.on)
+    return None
+
+
+def check() -> int:
+    """Compare every corpus entry with its expected parse; return failures."""
+    cases = [
+        (
+            "status",
+            replies.STATUS,
+            lambda raw: {
+                out: (route.video, route.audio)
+                for out, route in protocol.parse_status(raw).items()
+            },
+        ),
+        (
+            "output power",
+            replies.OUTPUT_POWER,
+            lambda raw: {
+                out: record.on for out, record in protocol.parse_output_power(raw).items()
+            },
+        ),
+        ("master power", replies.MASTER_POWER, protocol.parse_master_power),
+        ("feedback", replies.FEEDBACK, lambda raw: _feedback_fields(protocol.parse_feedback(raw))),
+    ]
+    failures = 0
+    for group, corpus, parse in cases:
+        for name, raw, expected in corpus:
+            got = parse(raw)
+            if got != expected:
+                failures += 1
+                print(f"FAIL {group} / {name}: expected {expected!r}, got {got!r}")
+    return failures
+
+
+def bench(number: int):
+    """Time each parser over its whole corpus and print the cost per reply."""
+    cases = [
+        ("parse_status", protocol.parse_status, replies.STATUS),
+        ("parse_output_power", protocol.parse_output_power, replies.OUTPUT_POWER),
+        ("parse_master_power", protocol.parse_master_power, replies.MASTER_POWER),
+        ("parse_feedback", protocol.parse_feedback, replies.FEEDBACK),
+    ]
+    for name, parse, corpus in cases:
+        raws = [raw for _, raw, _ in corpus]
+
+        def run():
+            for raw in raws:
+                parse(raw)
+
+        best = min(timeit.repeat(run, number=number, repeat=5))
+        per_reply = best / number / len(raws) * 1e6
+        print(f"{name:20} {per_reply:8.2f} us/reply  ({len(raws)} replies x {number})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=10000, help="corpus passes per timing run")
+    args = parser.parse_args()
+
+    failures = check()
+    if failures:
+        sys.exit(f"{failures} corpus mismatch(es)")
+    bench(args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Corpus of Atlona replies, as captured from an AT-OPUS-810M via the broker.
+
+Each entry is (name, raw reply, expected parse). Expected values use plain
+tuples so the corpus does not depend on the record types it checks.
+"""
+
+# Status: one video line and one audio line covering every output
+STATUS_810M = (
+    "x1Vx1,x2Vx2,x3Vx3,x4Vx4,x5Vx5,x6Vx6,x7Vx7,x8Vx8,x1Vx9,x1Vx10\n"
+    "x1Ax1,x2Ax2,x3Ax3,x4Ax4,x5Ax5,x6Ax6,x7Ax7,x8Ax8,x1Ax9,x1Ax10"
+)
+
+STATUS = [
+    (
+        "full 8x10",
+        STATUS_810M,
+        {
+            1: (1, 1), 2: (2, 2), 3: (3, 3), 4: (4, 4), 5: (5, 5),
+            6: (6, 6), 7: (7, 7), 8: (8, 8), 9: (1, 1), 10: (1, 1),
+        },
+    ),
+    (
+        "split audio",
+        "x1Vx1,x2Vx2,x3Vx3,x4Vx4\nx5Ax1,x5Ax2,x3Ax3,x4Ax4",
+        {1: (1, 5), 2: (2, 5), 3: (3, 3), 4: (4, 4)},
+    ),
+    (
+        # Connection dropped mid-line: the cut item is skipped
+        "truncated",
+        "x1Vx1,x2Vx2,x3Vx3,x4Vx4,x5Vx5,x6Vx6,x7Vx7,x8Vx8,x1Vx9,x1V",
+        {
+            1: (1, None), 2: (2, None), 3: (3, None), 4: (4, None), 5: (5, None),
+            6: (6, None), 7: (7, None), 8: (8, None), 9: (1, None),
+        },
+    ),
+    (
+        # Front-panel feedback arriving between the two Status lines
+        "interleaved feedback",
+        "x1Vx1,x2Vx2,x3Vx3,x4Vx4\nx3AVx2\nx1Ax1,x2Ax2,x3Ax3,x4Ax4",
+        {1: (1, 1), 2: (2, 2), 3: (3, 3), 4: (4, 4)},
+    ),
+    ("error", "Command FAILED: (Status)", {}),
+    ("empty", "", {}),
+]
+
+# x{n}$ sta replies, joined the way the coordinator joins them
+OUTPUT_POWER = [
+    (
+        "all outputs",
+        "\n".join(f"x{n}$ {'on' if n % 3 else 'off'}" for n in range(1, 11)),
+        {n: n % 3 != 0 for n in range(1, 11)},
+    ),
+    ("mixed case", "X1$ ON\nx2$off", {1: True, 2: False}),
+    ("truncated", "x1$ on\nx2$ off\nx3$ o", {1: True, 2: False}),
+    ("interleaved feedback", "x1$ on\nx4AVx1\nx2$ on", {1: True, 2: True}),
+    ("error", "Command FAILED: (x11$ sta)", {}),
+]
+
+# PWSTA replies
+MASTER_POWER = [
+    ("on", "PWON", True),
+    ("off", "PWOFF", False),
+    ("short form", "PON", True),
+    ("error", "Command FAILED: (PWSTA)", None),
+    ("empty", "", None),
+]
+
+# Unsolicited feedback lines: (kind, fields) or None if not feedback
+FEEDBACK = [
+    ("route", "x3AVx2", ("route", 3, (2,), True, True)),
+    ("video only", "x4Vx7", ("route", 4, (7,), True, False)),
+    ("audio only", "x2Ax1", ("route", 2, (1,), False, True)),
+    ("multi output", "x1AVx2,3,5", ("route", 1, (2, 3, 5), True, True)),
+    ("multi output prefixed", "x1AVx2,x3,x5", ("route", 1, (2, 3, 5), True, True)),
+    ("output power", "x5$ off", ("power", 5, False)),
+    ("master power", "PWON", ("master", True)),
+    ("status line", "x1Vx1,x2Vx2", None),
+    ("model", "AT-OPUS-810M", None),
+    ("banner", "Welcome to TELNET.", None),
+    ("truncated", "x3AVx", None),
+]
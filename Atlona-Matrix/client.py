@@ -1,114 +1,782 @@
+import asyncio
+import heapq
+import itertools
+import json
+import re
 import socket
 import logging
 import time
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+from .protocol import ROUTE_FEEDBACK, parse_feedback, parse_topology
 
 _LOGGER = logging.getLogger(__name__)
 
+# Idle time (seconds) before TCP keepalive probes start on the broker socket
+KEEPALIVE_IDLE = 30
+
+# Number of reply lines per command; anything not listed replies with one line
+REPLY_LINES = {
+    "Status": 2,  # video routing line + audio routing line
+}
+
+# Bounds (seconds) for the quiet period that ends a short/unexpected reply
+REPLY_IDLE_MIN = 0.05
+REPLY_IDLE_MAX = 1.0
+
+# Reconnect backoff (seconds) for the listening session
+LISTEN_RETRY_MIN = 1.0
+LISTEN_RETRY_MAX = 60.0
+
+# Circuit breaker: consecutive failed batches before calls fail fast, and
+# the bounds (seconds) of the backoff between BROKER:STATUS recovery probes
+BREAKER_THRESHOLD = 3
+BREAKER_PROBE_MIN = 5.0
+BREAKER_PROBE_MAX = 300.0
+
+# Command priorities: user actions go ahead of queued background polls
+PRIORITY_INTERACTIVE = 0
+PRIORITY_POLL = 1
+# Poll batches are sent in chunks of this many commands, yielding the
+# session in between, so a user command waits for one chunk at most
+POLL_CHUNK = 5
+# Callers allowed to wait for the session before new ones are rejected
+MAX_QUEUE_DEPTH = 16
+
+# Telnet negotiation bytes (RFC 854), for direct matrix sessions
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+# Login prompts and failures of a direct matrix session
+_LOGIN_PROMPT = re.compile(rb"(login|user\s*name|user)\s*:\s*$", re.IGNORECASE)
+_PASSWORD_PROMPT = re.compile(rb"password\s*:\s*$", re.IGNORECASE)
+_LOGIN_FAILED = re.compile(rb"fail|incorrect|invalid|denied", re.IGNORECASE)
+
+# Reply shapes used to match pipelined replies back to their commands
+_POWER_REPLY = re.compile(rb"^(x\d+)\$")
+_ROUTING_REPLY = re.compile(rb"^x\d+[AV]x\d+,")
+
+
+class AtlonaUnavailableError(Exception):
+    """The broker or matrix did not answer (or the circuit breaker is open)."""
+
+
+class AtlonaBusyError(Exception):
+    """A command was rejected because too many are queued for the matrix."""
+
+
+def command_succeeded(reply: str) -> bool:
+    """Return True if the matrix accepted a command (echo, not FAILED/empty)."""
+    return bool(reply) and "FAILED" not in reply.upper()
+
+
+def _input_number(input_id) -> str:
+    """Normalize an input id ("x3V", "3" or 3) to its number."""
+    return str(input_id).replace("x", "").replace("V", "")
+
+
+def _is_feedback(line: str) -> bool:
+    """Return True if a line looks like unsolicited state feedback."""
+    return parse_feedback(line) is not None
+
+
+def _probe_succeeded(reply: str) -> bool:
+    """Return True if a BROKER:STATUS probe shows the matrix is reachable.
+    
+    The broker answers with JSON; a direct matrix session does not know the
+    verb, but any reply at all proves it is up.
+    """
+    if not reply:
+        return False
+    try:
+        status = json.loads(reply)
+    except ValueError:
+        return True
+    return not isinstance(status, dict) or bool(status.get("connected", True))
+
+
+def _strip_telnet(data: bytes) -> tuple:
+    """Remove Telnet negotiation from matrix output.
+    
+    Returns (text, answers, tail): every option the matrix offers or asks
+    for is refused (so it does not echo), and an incomplete sequence at the
+    end is returned as tail to be prepended to the next chunk.
+    """
+    text = bytearray()
+    answers = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte != IAC:
+            text.append(byte)
+            i += 1
+            continue
+        if i + 1 >= len(data):
+            return bytes(text), bytes(answers), data[i:]
+        verb = data[i + 1]
+        if verb == IAC:
+            text.append(IAC)
+            i += 2
+        elif verb in (DO, DONT, WILL, WONT):
+            if i + 2 >= len(data):
+                return bytes(text), bytes(answers), data[i:]
+            if verb in (DO, WILL):
+                answers += bytes((IAC, WONT if verb == DO else DONT, data[i + 2]))
+            i += 3
+        elif verb == SB:
+            end = data.find(bytes((IAC, SE)), i + 2)
+            if end < 0:
+                return bytes(text), bytes(answers), data[i:]
+            i = end + 2
+        else:
+            i += 2
+    return bytes(text), bytes(answers), b""
+
+
+def _command_key(command: str) -> Optional[bytes]:
+    """Return the reply shape a command answers with, if distinctive."""
+    if command == "Status":
+        return b"Status"
+    if command.startswith("PW"):
+        return b"PW"
+    if ROUTE_FEEDBACK.match(command):
+        # Route commands are echoed back verbatim
+        return command.encode()
+    match = _POWER_REPLY.match(command.encode())
+    return match.group(1) if match else None
+
+
+def _reply_key(line: bytes) -> Optional[bytes]:
+    """Return the shape of a reply line (see _command_key)."""
+    if _ROUTING_REPLY.match(line):
+        return b"Status"
+    if line.startswith(b"PW"):
+        return b"PW"
+    match = _POWER_REPLY.match(line)
+    if match:
+        return match.group(1)
+    return line
+
+
+def _match_reply(line: bytes, keys: list, replies: list, wanted: list) -> Optional[int]:
+    """Pick the index of the pending command a reply line belongs to.
+    
+    Lines with a distinctive shape (x{n}$, routing, PW..., route echo) go to
+    the first pending command expecting that shape. Feedback-shaped lines no
+    command is waiting for are unsolicited (None); anything else is matched
+    in order.
+    """
+    pending = [i for i in range(len(keys)) if len(replies[i]) < wanted[i]]
+    if not pending:
+        return None
+    key = _reply_key(line)
+    for i in pending:
+        if keys[i] == key:
+            return i
+    if _is_feedback(line.decode("utf-8", errors="ignore")):
+        return None
+    for i in pending:
+        if keys[i] is None:
+            return i
+    return pending[0]
+
+
+class _Exchange:
+    """Replies collected for the batch currently in flight."""
+
+    __slots__ = ("queries", "keys", "wanted", "replies", "changed", "first_reply_at")
+
+    def __init__(self, commands: list):
+        # Echoes of these would be mistaken for replies; writes are answered
+        # with their own echo
+        self.queries = {cmd.encode() for cmd in commands if parse_feedback(cmd) is None}
+        self.keys = [_command_key(cmd) for cmd in commands]
+        self.wanted = [REPLY_LINES.get(cmd, 1) for cmd in commands]
+        self.replies = [[] for _ in commands]
+        self.changed = asyncio.Event()
+        self.first_reply_at = None
+
+    def complete(self) -> bool:
+        return all(len(r) >= w for r, w in zip(self.replies, self.wanted))
+
+
+class _PriorityLock:
+    """Lock handed to waiters by priority (lowest first), FIFO within one.
+    
+    At most max_waiters callers wait; when full, a new caller displaces the
+    newest waiter of a lower priority, or is rejected with AtlonaBusyError.
+    """
+
+    def __init__(self, max_waiters: int):
+        self.max_waiters = max_waiters
+        self._held = False
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self.metrics = {
+            "interactive": 0,
+            "poll": 0,
+            "preempted": 0,
+            "rejected": 0,
+            "max_depth": 0,
+        }
+
+    @property
+    def depth(self) -> int:
+        return len(self._waiters)
+
+    def _reject(self, future: asyncio.Future):
+        self.metrics["rejected"] += 1
+        future.set_exception(AtlonaBusyError("too many commands queued for the matrix"))
+
+    async def acquire(self, priority: int):
+        self.metrics["interactive" if priority == PRIORITY_INTERACTIVE else "poll"] += 1
+        if not self._held and not self._waiters:
+            self._held = True
+            return
+        
+        if len(self._waiters) >= self.max_waiters:
+            newest = max(self._waiters, key=lambda waiter: (waiter[0], waiter[1]))
+            if newest[0] <= priority:
+                self.metrics["rejected"] += 1
+                raise AtlonaBusyError("too many commands queued for the matrix")
+            self._waiters.remove(newest)
+            heapq.heapify(self._waiters)
+            self._reject(newest[2])
+        
+        if any(waiter[0] > priority for waiter in self._waiters):
+            self.metrics["preempted"] += 1
+        waiter = (priority, next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, waiter)
+        self.metrics["max_depth"] = max(self.metrics["max_depth"], len(self._waiters))
+        try:
+            await waiter[2]
+        except asyncio.CancelledError:
+            if waiter[2].done() and not waiter[2].cancelled() and waiter[2].exception() is None:
+                # Granted just as we were cancelled: pass it on
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._held = False
+
+    @asynccontextmanager
+    async def hold(self, priority: int = PRIORITY_INTERACTIVE):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
 
 class AtlonaClient:
-    """Optimized Atlona client that connects via the Telnet Broker service.
+    """Optimized asyncio Atlona client that connects via the Telnet Broker service.
+    
+    With direct=True it talks Telnet to the matrix itself instead: options
+    are refused during negotiation, the login prompts are answered, and echoed
+    queries are dropped.
     
     Optimizations:
     - Static info (model, hostname, version) fetched separately, cached by coordinator
     - Single 'Status' command returns both video and audio routing
     - Output power states polled less frequently
+    - One long-lived broker connection, health-checked and reopened on demand
+    - Replies are framed by line count, so commands return as soon as the
+      reply is complete instead of waiting out an idle timeout
+    - Multi-command queries are pipelined via send_batch() (one round-trip)
+    - Native asyncio streams: no executor threads, timeouts and cancellation
+      are handled by the event loop
+    - A background reader owns the stream; lines no command is waiting for
+      are passed to feedback listeners (push updates, see listen())
+    - A circuit breaker fails calls fast with AtlonaUnavailableError while
+      the matrix is unreachable, probing for recovery with backoff
+    - One prioritized command queue per matrix: interactive commands go
+      ahead of queued polls, poll sweeps yield between chunks, and the queue
+      depth is bounded (see metrics)
     """
     
-    def __init__(self, host: str, port: int = 2323, timeout: float = 5.0):
+    def __init__(
+        self,
+        host: str,
+        port: int = 2323,
+        timeout: float = 5.0,
+        direct: bool = False,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+    ):
         self.host = host
         self.port = port
         self._timeout = timeout
+        self._direct = direct
+        self._username = username
+        self._password = password
+        self._eol = "\r\n" if direct else "\n"
+        self._iac_tail = b""
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._inflight: Optional[_Exchange] = None
+        self._buf = b""
+        self._rtt = None
+        self._lock = _PriorityLock(MAX_QUEUE_DEPTH)
+        self._feedback_listeners = []
+        # Set once a listener has applied unsolicited feedback on the
+        # current session (reset when it drops)
+        self._feedback_seen = False
+        # Whether the firmware accepts one input routed to a list of
+        # outputs in a single command (None until first tried)
+        self._multi_route: Optional[bool] = None
+        # Circuit breaker: consecutive failed batches, and when the next
+        # recovery probe is due while open (None = closed)
+        self._failures = 0
+        self._retry_at: Optional[float] = None
+        self._probe_delay = BREAKER_PROBE_MIN
 
-    def _send_to_broker(self, command: str) -> str:
-        """Send a command to the broker and get response."""
-        s = None
+    @property
+    def connected(self) -> bool:
+        """Return True while the broker session is open."""
+        return self._writer is not None and self._is_healthy()
+
+    @property
+    def feedback_confirmed(self) -> bool:
+        """Return True once the open session has actually delivered feedback.
+        
+        An open socket alone does not mean the broker forwards state
+        changes, so polling should only relax once this is True.
+        """
+        return self._feedback_seen and self.connected
+
+    def add_feedback_listener(self, listener: Callable[[str], bool]) -> Callable[[], None]:
+        """Register a callback for unsolicited lines; returns a remover.
+        
+        The callback returns True if it applied the line as state feedback.
+        """
+        self._feedback_listeners.append(listener)
+        return lambda: self._feedback_listeners.remove(listener)
+
+    async def _connect(self):
+        """Open a new broker connection with TCP keepalive enabled."""
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port),
+            timeout=self._timeout
+        )
+        sock = self._writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+        self._buf = b""
+        self._iac_tail = b""
+        if self._direct:
+            try:
+                await self._login()
+            except BaseException:
+                self._drop()
+                raise
+        self._read_task = asyncio.get_running_loop().create_task(
+            self._read_loop(self._reader)
+        )
+        _LOGGER.debug(f"Connected to broker at {self.host}:{self.port}")
+
+    async def _read_prompt(self) -> bytes:
+        """Read matrix output until it prompts or goes quiet (direct only)."""
+        text = b""
+        while True:
+            try:
+                data = await asyncio.wait_for(self._reader.read(4096), timeout=REPLY_IDLE_MAX / 2)
+            except asyncio.TimeoutError:
+                return text
+            if not data:
+                raise ConnectionResetError("matrix closed the connection during login")
+            data, answers, self._iac_tail = _strip_telnet(self._iac_tail + data)
+            if answers:
+                self._writer.write(answers)
+            text += data
+            if text.rstrip().endswith(b":"):
+                return text
+
+    async def _login(self):
+        """Negotiate Telnet options and answer the login prompts.
+        
+        Also swallows the banner, so it is not mistaken for a reply.
+        """
+        text = await asyncio.wait_for(self._read_prompt(), timeout=self._timeout)
+        if _LOGIN_PROMPT.search(text.rstrip()):
+            if not self._username:
+                raise ConnectionRefusedError("matrix requires a Telnet login")
+            self._writer.write(f"{self._username}\r\n".encode())
+            text = await asyncio.wait_for(self._read_prompt(), timeout=self._timeout)
+        if _PASSWORD_PROMPT.search(text.rstrip()):
+            self._writer.write(f"{self._password or ''}\r\n".encode())
+            text = await asyncio.wait_for(self._read_prompt(), timeout=self._timeout)
+        if _LOGIN_FAILED.search(text):
+            raise ConnectionRefusedError(f"matrix Telnet login failed: {text.strip()!r}")
+        await self._writer.drain()
+
+    def _is_healthy(self) -> bool:
+        """Check an idle connection before reuse (peer closed it or not)."""
+        return not (
+            self._writer.is_closing()
+            or self._read_task is None
+            or self._read_task.done()
+        )
+
+    async def _checkout(self):
+        """Make sure the shared connection is open, reconnecting if it went stale."""
+        if self._writer is not None and not self._is_healthy():
+            _LOGGER.debug("Broker connection went stale, reconnecting")
+            self._drop()
+        if self._writer is None:
+            await self._connect()
+
+    def _drop(self):
+        """Close and forget the shared connection."""
+        if self._read_task and self._read_task is not asyncio.current_task():
+            self._read_task.cancel()
+        if self._writer:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        self._read_task = None
+        self._reader = None
+        self._writer = None
+        self._buf = b""
+        self._iac_tail = b""
+        self._feedback_seen = False
+        if self._inflight:
+            self._inflight.changed.set()
+
+    async def close(self):
+        """Close the broker connection (called on unload)."""
+        async with self._lock.hold():
+            writer = self._writer
+            self._drop()
+            if writer:
+                try:
+                    await writer.wait_closed()
+                except Exception:
+                    pass
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        """Split the stream into lines and dispatch them until it closes."""
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(self._timeout)
-            s.connect((self.host, self.port))
-            
-            if not command.endswith("\n"):
-                command += "\n"
-            s.sendall(command.encode())
-            
-            chunks = []
-            s.settimeout(1.0)
             while True:
-                try:
-                    data = s.recv(4096)
-                    if not data:
-                        break
-                    chunks.append(data)
-                except socket.timeout:
+                data = await reader.read(4096)
+                if not data:
                     break
+                if self._direct:
+                    data, answers, self._iac_tail = _strip_telnet(self._iac_tail + data)
+                    if answers and self._writer:
+                        self._writer.write(answers)
+                self._buf += data
+                while b"\n" in self._buf:
+                    line, self._buf = self._buf.split(b"\n", 1)
+                    line = line.rstrip(b"\r")
+                    if line.strip():
+                        self._dispatch(line)
+        except OSError as e:
+            _LOGGER.debug(f"Broker read error: {e}")
+        if reader is self._reader:
+            # Broker closed the session; reconnect on next command
+            self._drop()
+
+    def _dispatch(self, line: bytes):
+        """Hand a line to the in-flight batch, or to feedback listeners."""
+        ex = self._inflight
+        if self._direct and ex and line.strip() in ex.queries:
+            # Echo of a query we sent
+            return
+        idx = _match_reply(line, ex.keys, ex.replies, ex.wanted) if ex else None
+        if idx is not None:
+            if ex.first_reply_at is None:
+                ex.first_reply_at = time.monotonic()
+            ex.replies[idx].append(line)
+            if line.startswith(b"ERROR:"):
+                ex.wanted[idx] = len(ex.replies[idx])
+            ex.changed.set()
+            return
+        
+        decoded = line.decode("utf-8", errors="ignore").strip()
+        _LOGGER.debug(f"Unsolicited broker line: {repr(decoded)}")
+        for listener in list(self._feedback_listeners):
+            try:
+                if listener(decoded):
+                    self._feedback_seen = True
+            except Exception:
+                _LOGGER.exception("Error in Atlona feedback listener")
+
+    def _idle_gap(self) -> float:
+        """Quiet period after which a partial reply is treated as complete.
+        
+        Scales with the observed round-trip time so a slow broker is not cut
+        off early, while a fast one never waits the old fixed 1 s.
+        """
+        if self._rtt is None:
+            return REPLY_IDLE_MAX / 4
+        return min(REPLY_IDLE_MAX, max(REPLY_IDLE_MIN, self._rtt * 3))
+
+    async def _exchange(self, commands: list) -> list:
+        """Write commands back-to-back and wait for their framed replies.
+        
+        The reader task matches lines to commands. Each command is complete
+        once REPLY_LINES lines have been matched to it (or a single ERROR:
+        line). While any command has not answered at all we wait up to the
+        full timeout; once all have started, a short reply is ended by the
+        adaptive idle gap.
+        """
+        ex = _Exchange(commands)
+        self._inflight = ex
+        try:
+            started = time.monotonic()
+            self._writer.write("".join(f"{cmd}{self._eol}" for cmd in commands).encode())
+            await self._writer.drain()
             
-            decoded = b''.join(chunks).decode("utf-8", errors="ignore").strip()
-            
+            while not ex.complete():
+                wait = self._idle_gap() if all(ex.replies) else self._timeout
+                try:
+                    await asyncio.wait_for(ex.changed.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    if self._buf.strip():
+                        # Quiet: an unterminated tail still counts as a line
+                        tail, self._buf = self._buf.rstrip(b"\r\n"), b""
+                        self._dispatch(tail)
+                        continue
+                    if not any(ex.replies):
+                        raise
+                    break
+                ex.changed.clear()
+                if self._writer is None:
+                    if not any(ex.replies):
+                        raise ConnectionResetError("broker closed the connection")
+                    break
+        finally:
+            self._inflight = None
+        
+        if ex.first_reply_at is not None:
+            elapsed = ex.first_reply_at - started
+            self._rtt = elapsed if self._rtt is None else 0.8 * self._rtt + 0.2 * elapsed
+        return [b"\n".join(r) for r in ex.replies]
+
+    @property
+    def available(self) -> bool:
+        """Return False while the circuit breaker is open."""
+        return self._retry_at is None
+
+    async def _probe(self):
+        """Fail fast while the breaker is open; probe once a retry is due.
+        
+        Called with the lock held. A successful BROKER:STATUS probe closes
+        the breaker, a failed one doubles the wait before the next probe.
+        A direct session probes with Type instead.
+        """
+        if self._retry_at is None:
+            return
+        if time.monotonic() < self._retry_at:
+            raise AtlonaUnavailableError(
+                f"Atlona at {self.host}:{self.port} unreachable, "
+                f"next retry in {self._retry_at - time.monotonic():.0f}s"
+            )
+        try:
+            await self._checkout()
+            raw = (await self._exchange(["Type" if self._direct else "BROKER:STATUS"]))[0]
+            reply = raw.decode("utf-8", errors="ignore").strip()
+        except (OSError, asyncio.TimeoutError) as e:
+            _LOGGER.debug(f"Broker probe failed: {e}")
+            self._drop()
+            reply = ""
+        if not _probe_succeeded(reply):
+            self._probe_delay = min(self._probe_delay * 2, BREAKER_PROBE_MAX)
+            self._retry_at = time.monotonic() + self._probe_delay
+            raise AtlonaUnavailableError(
+                f"Atlona at {self.host}:{self.port} still unreachable: {reply!r}"
+            )
+        _LOGGER.info(f"Atlona at {self.host}:{self.port} reachable again")
+        self._failures = 0
+        self._retry_at = None
+        self._probe_delay = BREAKER_PROBE_MIN
+
+    def _record_failure(self, commands: list):
+        """Count a failed batch, trip the breaker at the threshold, and raise."""
+        self._failures += 1
+        if self._retry_at is None and self._failures >= BREAKER_THRESHOLD:
+            _LOGGER.warning(
+                f"Atlona at {self.host}:{self.port} failed {self._failures} times "
+                f"in a row, failing fast until it answers a probe"
+            )
+            self._retry_at = time.monotonic() + self._probe_delay
+        raise AtlonaUnavailableError(f"No reply from Atlona for {commands}")
+
+    @property
+    def metrics(self) -> dict:
+        """Command queue counters: commands per priority, preemptions, rejections."""
+        return {**self._lock.metrics, "depth": self._lock.depth}
+
+    async def send_batch(self, commands: list, priority: int = PRIORITY_INTERACTIVE) -> list:
+        """Pipeline several commands on one connection.
+        
+        All commands are written at once and the replies are matched back to
+        their commands, so N queries cost one round-trip. Returns one reply
+        string per command, "" for commands that failed or got no reply.
+        
+        Background polls pass PRIORITY_POLL: they queue behind interactive
+        commands and are sent POLL_CHUNK commands at a time.
+        
+        Raises AtlonaUnavailableError if nothing answered, and right away
+        (without touching the network) while the circuit breaker is open.
+        Raises AtlonaBusyError if the command queue is full.
+        """
+        commands = [cmd.strip() for cmd in commands]
+        if not commands:
+            return []
+        chunk = POLL_CHUNK if priority == PRIORITY_POLL else len(commands)
+        results = []
+        for start in range(0, len(commands), chunk):
+            replies = await self._send_batch(commands[start:start + chunk], priority)
+            if replies is None:
+                # The session failed; the rest of the sweep would only time out
+                results.extend([""] * (len(commands) - start))
+                break
+            results.extend(replies)
+        
+        # Decided once per sweep, so a chunk of commands the matrix rejects
+        # (e.g. outputs it does not have) does not discard the others
+        if not any(results):
+            self._record_failure(commands)
+        self._failures = 0
+        return results
+
+    async def _send_batch(self, commands: list, priority: int) -> Optional[list]:
+        """Send one pipelined batch while holding the session.
+        
+        Returns one reply per command, or None if the session failed (it is
+        dropped; send_batch() counts the failure).
+        """
+        async with self._lock.hold(priority):
+            await self._probe()
+            try:
+                reused = self._writer is not None
+                await self._checkout()
+                try:
+                    raws = await self._exchange(commands)
+                except (BrokenPipeError, ConnectionResetError):
+                    if not reused:
+                        raise
+                    # Reused connection died under us: retry once on a fresh one
+                    _LOGGER.debug("Broker connection reset, retrying on new connection")
+                    self._drop()
+                    await self._checkout()
+                    raws = await self._exchange(commands)
+            except asyncio.TimeoutError:
+                _LOGGER.warning(f"Broker timeout for commands: {commands}")
+                self._drop()
+                return None
+            except asyncio.CancelledError:
+                # A half-read reply would desync the stream; start over next time
+                self._drop()
+                raise
+            except Exception as e:
+                _LOGGER.warning(f"Broker send error: {e}")
+                self._drop()
+                return None
+        
+        results = []
+        for cmd, raw in zip(commands, raws):
+            decoded = raw.decode("utf-8", errors="ignore").strip()
             if decoded.startswith("ERROR:"):
                 _LOGGER.warning(f"Broker error: {decoded}")
-                return ""
+                decoded = ""
+            _LOGGER.debug(f"Broker response for '{cmd}': {repr(decoded)}")
+            results.append(decoded)
+        return results
+
+    async def listen(self):
+        """Keep the broker session open so unsolicited feedback is received.
+        
+        Runs until cancelled, reopening the session with exponential backoff
+        whenever it drops. Feedback is delivered to add_feedback_listener()
+        callbacks.
+        """
+        backoff = LISTEN_RETRY_MIN
+        while True:
+            read_task = None
+            try:
+                async with self._lock.hold(PRIORITY_POLL):
+                    await self._checkout()
+                    read_task = self._read_task
+            except (OSError, asyncio.TimeoutError, AtlonaBusyError) as e:
+                _LOGGER.debug(f"Broker listen connect failed: {e}")
             
-            _LOGGER.debug(f"Broker response for '{command.strip()}': {repr(decoded)}")
-            return decoded
+            if read_task is not None:
+                opened = time.monotonic()
+                await asyncio.wait([read_task])
+                if time.monotonic() - opened > LISTEN_RETRY_MAX:
+                    backoff = LISTEN_RETRY_MIN
             
-        except socket.timeout:
-            _LOGGER.warning(f"Broker timeout for command: {command.strip()}")
-            return ""
-        except Exception as e:
-            _LOGGER.warning(f"Broker send error: {e}")
-            return ""
-        finally:
-            if s:
-                try:
-                    s.close()
-                except:
-                    pass
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, LISTEN_RETRY_MAX)
+
+    async def _send_to_broker(self, command: str) -> str:
+        """Send a command to the broker and get response."""
+        return (await self.send_batch([command]))[0]
 
-    def send_command(self, command: str) -> str:
+    async def send_command(self, command: str) -> str:
         """Send a single command to Atlona via broker."""
         cmd = command.strip()
         if cmd.endswith("\r\n"):
             cmd = cmd[:-2]
         elif cmd.endswith("\n"):
             cmd = cmd[:-1]
-        return self._send_to_broker(cmd)
+        return await self._send_to_broker(cmd)
 
-    def get_static_info(self) -> dict:
+    async def get_static_info(self) -> dict:
         """Get static device info (call once, cache result).
         
-        Returns model, hostname, version - these don't change during operation.
-        3 commands total.
+        Returns model, hostname, version and the matrix topology (see
+        parse_topology) - these don't change during operation.
+        4 commands, one pipelined round-trip.
         """
+        model, hostname, version, status = await self.send_batch(
+            ["Type", "show_host_name", "Version", "Status"], PRIORITY_POLL
+        )
         return {
-            "model": self._send_to_broker("Type"),
-            "hostname": self._send_to_broker("show_host_name"),
-            "version": self._send_to_broker("Version"),
+            "model": model,
+            "hostname": hostname,
+            "version": version,
+            "topology": parse_topology(model, status),
         }
 
-    def get_routing_status(self) -> dict:
+    async def get_routing_status(self) -> dict:
         """Get current routing and power status.
         
         Uses single 'Status' command for both video and audio routing.
-        2 commands total (Status + PWSTA).
+        2 commands, one pipelined round-trip (Status + PWSTA).
         """
+        status_raw, power = await self.send_batch(["Status", "PWSTA"], PRIORITY_POLL)  # Status returns both V and A
         return {
-            "status_raw": self._send_to_broker("Status"),  # Returns both V and A
-            "power": self._send_to_broker("PWSTA"),
+            "status_raw": status_raw,
+            "power": power,
         }
 
-    def get_output_power_states(self) -> str:
+    async def get_output_power_states(self, outputs: int = 10) -> str:
         """Get output power states for all outputs.
         
-        10 commands (one per output). Call less frequently.
+        One command per output, pipelined in POLL_CHUNK-sized round-trips.
         """
-        output_power_lines = []
-        for i in range(1, 11):
-            resp = self._send_to_broker(f"x{i}$ sta")
-            if resp:
-                output_power_lines.append(resp)
-        return "\n".join(output_power_lines)
+        replies = await self.send_batch(
+            [f"x{i}$ sta" for i in range(1, outputs + 1)], PRIORITY_POLL
+        )
+        return "\n".join(resp for resp in replies if resp)
 
-    def get_all_status(self):
+    async def get_all_status(self, outputs: int = 10):
         """Legacy method for compatibility - fetches everything.
         
         Use get_routing_status() + cached static info instead.
@@ -124,13 +792,14 @@ class AtlonaClient:
         }
         
         try:
-            result["power"] = self._send_to_broker("PWSTA")
-            result["model"] = self._send_to_broker("Type")
-            result["hostname"] = self._send_to_broker("show_host_name")
-            result["version"] = self._send_to_broker("Version")
+            replies = await self.send_batch(
+                ["PWSTA", "Type", "show_host_name", "Version", "Status"]
+                + [f"x{i}$ sta" for i in range(1, outputs + 1)],
+                PRIORITY_POLL,
+            )
+            result["power"], result["model"], result["hostname"], result["version"], status = replies[:5]
             
             # Use single Status command
-            status = self._send_to_broker("Status")
             lines = status.split("\n")
             if len(lines) >= 2:
                 result["video_raw"] = lines[0]
@@ -138,12 +807,7 @@ class AtlonaClient:
             elif len(lines) == 1:
                 result["video_raw"] = lines[0]
             
-            output_power_lines = []
-            for i in range(1, 11):
-                resp = self._send_to_broker(f"x{i}$ sta")
-                if resp:
-                    output_power_lines.append(resp)
-            result["output_power_raw"] = "\n".join(output_power_lines)
+            result["output_power_raw"] = "\n".join(resp for resp in replies[5:] if resp)
             
             return result
             
@@ -151,31 +815,95 @@ class AtlonaClient:
             _LOGGER.error(f"Atlona get_all_status error: {e}")
             return result
 
-    def set_output_power(self, output_id: int, power: bool) -> str:
+    async def set_output_power(self, output_id: int, power: bool) -> str:
         """Set output power state."""
         cmd = "on" if power else "off"
-        return self.send_command(f"x{output_id}$ {cmd}")
+        return await self.send_command(f"x{output_id}$ {cmd}")
 
-    def set_route(self, output_id: int, input_id: str) -> str:
+    async def set_route(self, output_id: int, input_id: str) -> str:
         """Set video/audio routing."""
-        clean_input = input_id.replace("x", "").replace("V", "")
-        return self.send_command(f"x{clean_input}AVx{output_id}")
+        clean_input = _input_number(input_id)
+        return await self.send_command(f"x{clean_input}AVx{output_id}")
+
+    def route_commands(self, input_id, outputs: list) -> list:
+        """Build the command(s) routing one input to several outputs.
+        
+        Uses the multi-output syntax (x{in}AVx{o1},x{o2},...) unless the
+        firmware has rejected it before.
+        """
+        clean_input = _input_number(input_id)
+        outputs = sorted(outputs)
+        if len(outputs) > 1 and self._multi_route is not False:
+            return [f"x{clean_input}AV" + ",".join(f"x{out}" for out in outputs)]
+        return [f"x{clean_input}AVx{out}" for out in outputs]
+
+    async def send_route_batch(self, commands: list) -> list:
+        """Send a batch that may contain multi-output route commands.
+        
+        A multi-output route the firmware rejects is retried as per-output
+        commands, and the syntax is not used again. Returns (command, reply)
+        pairs, with a rejected multi-output command replaced by the pairs of
+        its per-output fallback.
+        """
+        results = list(zip(commands, await self.send_batch(commands)))
+        
+        fallback = []
+        for idx, (command, reply) in enumerate(results):
+            match = ROUTE_FEEDBACK.match(command)
+            if not match or "," not in match.group(3) or not reply:
+                continue
+            if command_succeeded(reply):
+                self._multi_route = True
+                continue
+            if self._multi_route is None:
+                _LOGGER.info("Matrix rejected multi-output routing, using per-output commands")
+                self._multi_route = False
+            input_num, kind, outputs = match.groups()
+            singles = [
+                f"x{input_num}{kind}x{out.lower().replace('x', '')}"
+                for out in outputs.split(",")
+            ]
+            fallback.append((idx, singles))
+        
+        if not fallback:
+            return results
+        retried = iter(await self.send_batch([cmd for _, singles in fallback for cmd in singles]))
+        replacements = {
+            idx: [(cmd, next(retried)) for cmd in singles] for idx, singles in fallback
+        }
+        expanded = []
+        for idx, pair in enumerate(results):
+            expanded.extend(replacements.get(idx, [pair]))
+        return expanded
+
+    async def set_route_many(self, input_id, outputs: list) -> list:
+        """Route one input to several outputs, in one command where supported.
+        
+        Returns (command, reply) pairs, see send_route_batch().
+        """
+        return await self.send_route_batch(self.route_commands(input_id, outputs))
     
-    def check_broker_status(self) -> dict:
+    async def check_broker_status(self) -> dict:
         """Check broker connection status."""
-        import json
-        resp = self._send_to_broker("BROKER:STATUS")
+        try:
+            resp = await self._send_to_broker("BROKER:STATUS")
+        except AtlonaUnavailableError as e:
+            return {"connected": False, "error": str(e)}
         try:
             return json.loads(resp)
-        except:
+        except ValueError:
             return {"connected": False, "error": resp}
     
-    def wait_for_connection(self, timeout: float = 30.0) -> bool:
+    async def wait_for_connection(self, timeout: float = 30.0) -> bool:
         """Wait for broker to be connected to Atlona."""
         old_timeout = self._timeout
         self._timeout = timeout
         try:
-            resp = self._send_to_broker("BROKER:WAIT")
+            if self._direct:
+                return bool(await self._send_to_broker("Type"))
+            resp = await self._send_to_broker("BROKER:WAIT")
             return "OK" in resp
+        except AtlonaUnavailableError:
+            return False
         finally:
             self._timeout = old_timeout
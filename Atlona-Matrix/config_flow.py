@@ -3,22 +3,122 @@ from __future__ import annotations
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
-from .const import DOMAIN
+from .const import (
+    CONF_HOST,
+    CONF_INPUT_NAMES,
+    CONF_OUTPUT_NAMES,
+    CONF_PASSWORD,
+    CONF_POLL_CEILING,
+    CONF_POLL_FLOOR,
+    CONF_PORT,
+    CONF_TRANSPORT,
+    CONF_USERNAME,
+    DEFAULT_DIRECT_PORT,
+    DEFAULT_INPUT_NAMES,
+    DEFAULT_OUTPUT_NAMES,
+    DEFAULT_POLL_CEILING,
+    DEFAULT_POLL_FLOOR,
+    DEFAULT_PORT,
+    DOMAIN,
+    TRANSPORT_BROKER,
+    TRANSPORT_DIRECT,
+)
+
+
+def _format_names(names: dict) -> str:
+    """Render a name map as one "number: name" line per entry."""
+    return "\n".join(
+        f"{num}: {name}" for num, name in sorted(names.items(), key=lambda item: int(item[0]))
+    )
+
+
+def _parse_names(text: str) -> dict:
+    """Parse "number: name" lines; raises ValueError on a malformed line.
+    
+    Keys are strings so the map survives the JSON round trip of entry options.
+    """
+    names = {}
+    for line in text.replace(",", "\n").splitlines():
+        if not line.strip():
+            continue
+        num, sep, name = line.partition(":")
+        if not sep or not name.strip() or int(num) < 1:
+            raise ValueError(line)
+        names[str(int(num))] = name.strip()
+    if len(set(names.values())) != len(names):
+        raise ValueError("duplicate name")
+    return names
 
 
 class AtlonaFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return AtlonaOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None):
         errors = {}
         if user_input is not None:
-            return self.async_create_entry(title=user_input["host"], data=user_input)
+            direct = user_input[CONF_TRANSPORT] == TRANSPORT_DIRECT
+            user_input.setdefault(CONF_PORT, DEFAULT_DIRECT_PORT if direct else DEFAULT_PORT)
+            return self.async_create_entry(title=user_input[CONF_HOST], data=user_input)
 
+        # Port defaults to 2323 for the broker and 23 for a direct session;
+        # the login is only used by the direct transport
         data_schema = vol.Schema({
-            vol.Required("host"): str,
-            vol.Optional("port", default=23): int,
+            vol.Required(CONF_HOST): str,
+            vol.Optional(CONF_TRANSPORT, default=TRANSPORT_BROKER): vol.In(
+                [TRANSPORT_BROKER, TRANSPORT_DIRECT]
+            ),
+            vol.Optional(CONF_PORT): int,
+            vol.Optional(CONF_USERNAME): str,
+            vol.Optional(CONF_PASSWORD): str,
         })
 
         return self.async_show_form(step_id="user", data_schema=data_schema, errors=errors)
+
+
+class AtlonaOptionsFlow(config_entries.OptionsFlow):
+    """Adaptive polling bounds and input/output names."""
+
+    def __init__(self, config_entry):
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        errors = {}
+        options = self.config_entry.options
+        input_names = _format_names(options.get(CONF_INPUT_NAMES, DEFAULT_INPUT_NAMES))
+        output_names = _format_names(options.get(CONF_OUTPUT_NAMES, DEFAULT_OUTPUT_NAMES))
+        if user_input is not None:
+            input_names = user_input[CONF_INPUT_NAMES]
+            output_names = user_input[CONF_OUTPUT_NAMES]
+            try:
+                names = {
+                    CONF_INPUT_NAMES: _parse_names(input_names),
+                    CONF_OUTPUT_NAMES: _parse_names(output_names),
+                }
+            except ValueError:
+                errors["base"] = "invalid_names"
+            if user_input[CONF_POLL_CEILING] < user_input[CONF_POLL_FLOOR]:
+                errors["base"] = "ceiling_below_floor"
+            if not errors:
+                return self.async_create_entry(title="", data={**user_input, **names})
+
+        data_schema = vol.Schema({
+            vol.Required(
+                CONF_POLL_FLOOR,
+                default=options.get(CONF_POLL_FLOOR, DEFAULT_POLL_FLOOR),
+            ): vol.All(int, vol.Range(min=1)),
+            vol.Required(
+                CONF_POLL_CEILING,
+                default=options.get(CONF_POLL_CEILING, DEFAULT_POLL_CEILING),
+            ): vol.All(int, vol.Range(min=1)),
+            vol.Required(CONF_INPUT_NAMES, default=input_names): str,
+            vol.Required(CONF_OUTPUT_NAMES, default=output_names): str,
+        })
+
+        return self.async_show_form(step_id="init", data_schema=data_schema, errors=errors)
@@ -1,8 +1,65 @@
 DOMAIN = "atlona_matrix"
-DEFAULT_PORT = 2323  # Broker port (was 23 for direct Atlona)
+DEFAULT_PORT = 2323  # Broker port
+DEFAULT_DIRECT_PORT = 23  # Matrix Telnet port
 CONF_HOST = "host"
 CONF_PORT = "port"
+CONF_USERNAME = "username"
+CONF_PASSWORD = "password"
+
+# How the integration reaches the matrix: through the Telnet broker, or a
+# direct Telnet session (one client only)
+CONF_TRANSPORT = "transport"
+TRANSPORT_BROKER = "broker"
+TRANSPORT_DIRECT = "direct"
+
+CONF_POLL_FLOOR = "poll_floor"
+CONF_POLL_CEILING = "poll_ceiling"
+CONF_INPUT_NAMES = "input_names"
+CONF_OUTPUT_NAMES = "output_names"
+# Discovered matrix size, cached in the entry data
+CONF_INPUT_COUNT = "input_count"
+CONF_OUTPUT_COUNT = "output_count"
+
+# Adaptive polling bounds (seconds): fastest poll after activity/changes,
+# slowest poll once nothing has changed for a while
+DEFAULT_POLL_FLOOR = 10
+DEFAULT_POLL_CEILING = 300
 PLATFORMS = ["media_player", "switch", "select"]
 
+# Default friendly names (editable in the options flow): input number -> source
+DEFAULT_INPUT_NAMES = {
+    1: "nVidiaShield4k",
+    2: "Kaleidescape Strato C",
+    3: "Media Room Computer",
+    4: "nVidiaShield4k-2",
+    5: "Roku 4k Player",
+    6: "Amcrest NVR",
+    7: "AppleTV 4K",
+    8: "Undefined",
+}
+
+# Output number -> zone name; one set of entities is created per output
+DEFAULT_OUTPUT_NAMES = {
+    1: "Master Bedroom",
+    2: "Gameroom",
+    3: "Patio Front Wall",
+    4: "Small Garage",
+    5: "Patio Mantle",
+    6: "Living Room",
+    7: "Jakes Room",
+    8: "Parkers Room",
+    9: "Media Room",
+    10: "Undefined",
+}
+
+# Services
+SERVICE_APPLY_ROUTING = "apply_routing"
+SERVICE_ROUTE_INPUT = "route_input"
+ATTR_ENTRY_ID = "entry_id"
+ATTR_ROUTES = "routes"
+ATTR_POWER = "power"
+ATTR_INPUT = "input"
+ATTR_OUTPUTS = "outputs"
+
 # Broker is at 192.168.4.36:2323
-# To use direct connection, set port to 23
+# To connect to the matrix itself, choose the direct transport (port 23)
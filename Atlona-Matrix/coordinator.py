@@ -1,114 +1,588 @@
+import asyncio
 import logging
+import time
 from datetime import timedelta
+from typing import Optional
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .client import AtlonaClient
+from .client import (
+    PRIORITY_POLL,
+    AtlonaBusyError,
+    AtlonaClient,
+    AtlonaUnavailableError,
+    command_succeeded,
+)
+from .const import (
+    DEFAULT_INPUT_NAMES,
+    DEFAULT_OUTPUT_NAMES,
+    DEFAULT_POLL_CEILING,
+    DEFAULT_POLL_FLOOR,
+    DOMAIN,
+)
+from .protocol import (
+    RouteRecord,
+    Topology,
+    parse_master_power,
+    parse_output_power,
+    parse_status,
+)
+from .scheduler import AdaptiveScheduler
+from .state import AtlonaState
 
 _LOGGER = logging.getLogger(__name__)
 
+# Independently scheduled data classes (static info is fetched once)
+POLL_CLASSES = ("master", "routes", "output_power")
+# The refresh timer can fire up to ~1 s before the earliest class is due
+# (HA rounds and jitters it); classes due within this slack are polled
+DUE_TOLERANCE = 1.0
+# Quiet period after the last write before a targeted check confirms it
+VERIFY_DELAY = 3.0
+# Last-known state persisted across restarts (see async_restore)
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+
+
+def merge_routes(current, routes: dict) -> dict:
+    """Merge parsed Status routes into the current ones.
+    
+    parse_status() returns only the complete items of a truncated reply, so
+    outputs it missed, and halves it missed (a late audio line), keep their
+    current input.
+    """
+    merged = dict(current)
+    for out, route in routes.items():
+        old = merged.get(out)
+        if old is not None:
+            route = route._replace(
+                video=old.video if route.video is None else route.video,
+                audio=old.audio if route.audio is None else route.audio,
+            )
+        merged[out] = route
+    return merged
+
+
+def snapshot_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding an entry's last-known state."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
 
 class AtlonaDataUpdateCoordinator(DataUpdateCoordinator):
-    def __init__(self, hass: HomeAssistant, host: str, port: int):
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        host: str,
+        port: int,
+        poll_floor: float = DEFAULT_POLL_FLOOR,
+        poll_ceiling: float = DEFAULT_POLL_CEILING,
+        input_names: dict = DEFAULT_INPUT_NAMES,
+        output_names: dict = DEFAULT_OUTPUT_NAMES,
+        topology: Optional[Topology] = None,
+        direct: bool = False,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        entry_id: Optional[str] = None,
+    ):
         self.host = host
         self.port = port
-        self.client = AtlonaClient(host, port)
+        self.client = AtlonaClient(
+            host, port, direct=direct, username=username, password=password
+        )
         
-        # Cache for static device info (fetched once)
+        # Matrix size, cached in the config entry and re-discovered with the
+        # static info; polling and entities are sized from it
+        self.topology = topology
+        self.set_names(input_names, output_names)
+        
+        # Cache for static device info (fetched once, or restored and then
+        # only re-fetched if the firmware version changed)
         self._static_info = None
+        self._check_version = False
+        self._store = snapshot_store(hass, entry_id) if entry_id else None
+        
+        # Per-data-class poll intervals: fast after activity or changes,
+        # backing off exponentially while nothing changes
+        self._scheduler = AdaptiveScheduler(POLL_CLASSES, poll_floor, poll_ceiling)
         
-        # Counter for less frequent polling of output power
-        self._poll_count = 0
+        # Targeted checks owed for optimistic writes: "routes", "master" or
+        # an output number (output power)
+        self._verify_pending = set()
+        self._verify_unsub = None
+        
+        # Set by async_request_refresh(): the next update polls every class
+        self._refresh_requested = False
+        
+        # Last-write-wins command queues: output number (or "master") ->
+        # {"route": input_num, "power": bool}, drained by one task per key
+        self._write_queues = {}
+        self._write_workers = {}
+        
+        # (callback, context) of every listener, and the state they were last
+        # notified of, for per-output fan-out
+        self._context_listeners = []
+        self._notified = (None, None)
         
         super().__init__(
             hass,
             _LOGGER,
             name="atlona_matrix",
-            update_interval=timedelta(seconds=60),  # Increased from 30s
+            update_interval=timedelta(seconds=poll_floor),
         )
+        
+        self.client.add_feedback_listener(self._handle_feedback)
+
+    async def async_request_refresh(self) -> None:
+        """Request a refresh that polls every data class, not just the due ones."""
+        self._refresh_requested = True
+        await super().async_request_refresh()
+
+    @callback
+    def async_add_listener(self, update_callback, context=None):
+        """Listen for data updates; `context` is the entity's output number."""
+        remove = super().async_add_listener(update_callback, context)
+        listener = (update_callback, context)
+        self._context_listeners.append(listener)
+
+        @callback
+        def remove_listener():
+            remove()
+            if listener in self._context_listeners:
+                self._context_listeners.remove(listener)
+
+        return remove_listener
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Call back only the entities whose slice of the data changed."""
+        changed = self._changed_outputs()
+        self._notified = (self.last_update_success, self.data)
+        if self._store is not None and self.data is not None and changed != frozenset():
+            self._store.async_delay_save(self._snapshot, SAVE_DELAY)
+        for update_callback, context in list(self._context_listeners):
+            if changed is None or context in changed:
+                update_callback()
 
-    def _parse_status(self, status_raw: str) -> dict:
-        """Parse combined Status response (returns both video and audio lines)."""
-        lines = status_raw.replace("\r\n", "\n").strip().split("\n")
-        video = []
-        audio = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            # Video line contains 'V', audio line contains 'A'
-            if "V" in line and "A" not in line:
-                video = line.split(",")
-            elif "A" in line:
-                audio = line.split(",")
-        
-        out = {}
-        for i in range(min(len(video), len(audio))):
-            out[i + 1] = {"video": video[i], "audio": audio[i]}
-        return out
-
-    def _parse_output_power(self, power_raw: str) -> dict:
-        """Parse output power states from raw response."""
-        states = {}
-        if not power_raw:
-            return states
-        for line in power_raw.replace("\r\n", "\n").split("\n"):
-            line = line.strip()
-            if not line:
-                continue
-            if "$" in line:
-                parts = line.split()
-                if len(parts) >= 2:
-                    try:
-                        num = int(parts[0].replace("x", "").replace("$", ""))
-                        state = parts[1].lower() == "on"
-                        states[num] = state
-                    except (ValueError, IndexError):
-                        continue
-        return states
+    def _changed_outputs(self):
+        """Return the outputs whose route/power changed since the last notify.
+        
+        None means everyone must update: first data, availability change, or
+        a change to state every entity shows (master power, device info).
+        """
+        last_success, previous = self._notified
+        if last_success != self.last_update_success or self.data is None:
+            return None
+        return self.data.diff(previous)
+
+    @callback
+    def _handle_feedback(self, line: str) -> bool:
+        """Apply a route/power feedback line and push it to entities.
+        
+        Used for unsolicited feedback and for the expected result of our own
+        commands. Returns False if the line is not state feedback.
+        """
+        if self.data is None:
+            return False
+        data = self.data.apply(line)
+        if data is None:
+            return False
+        
+        _LOGGER.debug(f"Applied Atlona feedback: {line}")
+        if data is not self.data:
+            self.async_set_updated_data(data)
+        return True
+
+    def _current_input(self, output_num: int):
+        """Return the input number currently routed to an output, if known."""
+        return self.data.input_of(output_num) if self.data is not None else None
+
+    def _schedule_verify(self, verify) -> None:
+        """Queue a targeted check ("routes", "master" or an output number).
+        
+        Debounced: every new write restarts the delay, so a burst of changes
+        is confirmed by one query once things settle.
+        """
+        self._verify_pending.add(verify)
+        if self._verify_unsub is not None:
+            self._verify_unsub()
+        self._verify_unsub = async_call_later(self.hass, VERIFY_DELAY, self._async_verify)
+
+    def _apply_results(self, results: list) -> bool:
+        """Apply accepted commands to the cache in one update.
+        
+        `results` are (command, reply) pairs. The matrix echoes a command it
+        accepted, so the command itself is the expected state change. Returns
+        False if any command failed (its state is then unknown).
+        """
+        data = self.data
+        ok = True
+        for command, reply in results:
+            if command_succeeded(reply) and data is not None:
+                applied = data.apply(command)
+                if applied is not None:
+                    data = applied
+                    continue
+            _LOGGER.warning(f"Atlona command failed: {command} ({reply!r})")
+            ok = False
+        if data is not self.data:
+            self.async_set_updated_data(data)
+        return ok
+
+    async def _async_write(self, results: list, verify) -> None:
+        """Apply a successful write to the cache right away, verify it later.
+        
+        An empty or FAILED reply means the state is unknown, so fall back to
+        a full refresh.
+        """
+        if self._apply_results(results):
+            self._schedule_verify(verify)
+        else:
+            await self.async_request_refresh()
+
+    async def _async_verify(self, _now) -> None:
+        """Confirm optimistic writes with one batched targeted query."""
+        self._verify_unsub = None
+        pending, self._verify_pending = self._verify_pending, set()
+        if self.data is None:
+            return
+        
+        commands = []
+        if "routes" in pending:
+            commands.append("Status")
+        if "master" in pending:
+            commands.append("PWSTA")
+        outputs = sorted(item for item in pending if isinstance(item, int))
+        commands.extend(f"x{out}$ sta" for out in outputs)
+        
+        try:
+            replies = dict(zip(commands, await self.client.send_batch(commands, PRIORITY_POLL)))
+        except (AtlonaUnavailableError, AtlonaBusyError) as err:
+            _LOGGER.debug(f"Atlona verification skipped: {err}")
+            return
+        changes = {}
+        if routes := parse_status(replies.get("Status", "")):
+            changes["routes"] = merge_routes(self.data.routes, routes)
+        if (power := parse_master_power(replies.get("PWSTA", ""))) is not None:
+            changes["power"] = power
+        power_raw = "\n".join(replies.get(f"x{out}$ sta", "") for out in outputs)
+        if output_power := parse_output_power(power_raw):
+            changes["output_power"] = {
+                **self.data.output_power,
+                **{out: record.on for out, record in output_power.items()},
+            }
+        
+        data = self.data.evolve(**changes)
+        if data is not self.data:
+            _LOGGER.debug("Atlona verification corrected optimistic state")
+            self.async_set_updated_data(data)
+
+    async def _async_queue_write(self, key, kind: str, value) -> None:
+        """Queue a route/power write for one output, coalescing bursts.
+        
+        Only the latest value per output and kind is sent: a write queued
+        while an earlier one is in flight replaces any value still waiting,
+        and results of superseded commands are not applied, so the UI never
+        flickers through intermediate sources. Returns once the output's
+        queue has drained.
+        """
+        self._note_activity()
+        self._write_queues.setdefault(key, {})[kind] = value
+        worker = self._write_workers.get(key)
+        if worker is None or worker.done():
+            worker = self.hass.async_create_task(self._async_drain_writes(key))
+            self._write_workers[key] = worker
+        await asyncio.shield(worker)
+
+    def _write_command(self, key, kind: str, value) -> str:
+        """Build the matrix command for a queued write."""
+        if key == "master":
+            return "PWON" if value else "PWOFF"
+        if kind == "route":
+            return f"x{value}AVx{key}"
+        return f"x{key}$ {'on' if value else 'off'}"
+
+    async def _async_drain_writes(self, key) -> None:
+        """Send queued writes for one output until none are left."""
+        try:
+            while pending := self._write_queues.pop(key, None):
+                kinds = list(pending)
+                commands = [self._write_command(key, kind, pending[kind]) for kind in kinds]
+                replies = await self.client.send_batch(commands)
+                
+                # Drop results a newer write for the same kind has superseded
+                newer = self._write_queues.get(key, {})
+                results = [
+                    (command, reply)
+                    for kind, command, reply in zip(kinds, commands, replies)
+                    if kind not in newer
+                ]
+                if not results:
+                    continue
+                if not self._apply_results(results):
+                    await self.async_request_refresh()
+                elif key == "master":
+                    self._schedule_verify("master")
+                else:
+                    for kind in kinds:
+                        self._schedule_verify("routes" if kind == "route" else key)
+        except BaseException:
+            # Writes queued behind the failed batch fail with it (their
+            # callers await this worker); left queued, they would go out
+            # later alongside some unrelated write
+            if self._write_queues.pop(key, None):
+                _LOGGER.debug(f"Discarded queued Atlona writes for {key}")
+            raise
+        finally:
+            self._write_workers.pop(key, None)
+
+    async def async_set_route(self, output_num: int, input_num: int) -> None:
+        """Route an input to one output (optimistic, coalesced)."""
+        await self._async_queue_write(output_num, "route", input_num)
+
+    async def async_route_input(self, input_num: int, outputs: list) -> None:
+        """Route one input to several outputs in a single command (optimistic)."""
+        self._note_activity()
+        await self._async_write(
+            await self.client.set_route_many(input_num, outputs), "routes"
+        )
+
+    async def async_set_output_power(self, output_num: int, power: bool) -> None:
+        """Switch one output on or off (optimistic, coalesced)."""
+        await self._async_queue_write(output_num, "power", power)
+
+    async def async_set_master_power(self, power: bool) -> None:
+        """Switch the matrix on or off (optimistic, coalesced)."""
+        await self._async_queue_write("master", "power", power)
+
+    async def async_apply_routing(self, routes: dict, power: dict) -> None:
+        """Apply a routing "scene": only changed routes/power are sent.
+        
+        `routes` maps output number -> input number, `power` maps output
+        number -> on/off. Everything that differs from the cached state goes
+        out as one pipelined batch, followed by a single refresh. Outputs
+        that share an input are routed with one multi-output command.
+        """
+        by_input = {}
+        for output_num, input_num in sorted(routes.items()):
+            if self._current_input(output_num) != input_num:
+                by_input.setdefault(input_num, []).append(output_num)
+        commands = [
+            command
+            for input_num, outputs in sorted(by_input.items())
+            for command in self.client.route_commands(input_num, outputs)
+        ]
+        output_power = self.data.output_power if self.data is not None else {}
+        commands.extend(
+            f"x{output_num}$ {'on' if state else 'off'}"
+            for output_num, state in sorted(power.items())
+            if output_power.get(output_num) != state
+        )
+        if not commands:
+            _LOGGER.debug("Atlona routing scene already applied")
+            return
+        
+        self._note_activity()
+        self._apply_results(await self.client.send_route_batch(commands))
+        await self.async_request_refresh()
+
+    async def async_restore(self) -> bool:
+        """Load the last-known state saved by a previous run.
+        
+        Returns True if entities can start from it while the first live
+        refresh runs in the background.
+        """
+        if self._store is None:
+            return False
+        stored = await self._store.async_load()
+        if not stored:
+            return False
+        try:
+            static = {key: stored["static"][key] for key in ("model", "hostname", "version")}
+            data = AtlonaState().evolve(
+                power=stored["power"],
+                routes={
+                    int(out): RouteRecord(int(out), video, audio)
+                    for out, (video, audio) in stored["routes"].items()
+                },
+                output_power={
+                    int(out): on for out, on in stored["output_power_states"].items()
+                },
+                **{key: value.strip() for key, value in static.items()},
+            )
+        except (KeyError, TypeError, ValueError, AttributeError) as err:
+            _LOGGER.warning(f"Ignoring unreadable saved Atlona state: {err}")
+            return False
+        
+        self._static_info = {**static, "topology": None}
+        self._check_version = True
+        self.data = data
+        self._notified = (self.last_update_success, data)
+        _LOGGER.debug("Restored last-known Atlona state")
+        return True
+
+    def _snapshot(self) -> dict:
+        """Serialize the state async_restore() starts from (JSON-safe)."""
+        data = self.data
+        return {
+            "static": {key: self._static_info.get(key, "") for key in ("model", "hostname", "version")},
+            "power": data.power,
+            "routes": {
+                str(out): [route.video, route.audio] for out, route in data.routes.items()
+            },
+            "output_power_states": {
+                str(out): on for out, on in data.output_power.items()
+            },
+        }
+
+    async def async_shutdown(self) -> None:
+        """Cancel a pending verification when the entry unloads."""
+        if self._verify_unsub is not None:
+            self._verify_unsub()
+            self._verify_unsub = None
+        await super().async_shutdown()
+
+    @property
+    def outputs(self) -> list:
+        """Output numbers of the matrix (the named outputs until discovered)."""
+        if self.topology:
+            return list(range(1, self.topology.outputs + 1))
+        return sorted(self.output_names)
+
+    def set_names(self, input_names: dict, output_names: dict) -> None:
+        """Compile the input/output name maps into shared lookup indexes.
+        
+        Keys may be strings, as name maps come back from config entry options.
+        Once the input count is known, unnamed inputs get a default name and
+        names for inputs the matrix does not have are dropped.
+        """
+        self._names = (input_names, output_names)
+        input_names = {int(num): name for num, name in input_names.items()}
+        if self.topology and self.topology.inputs:
+            input_names = {
+                num: input_names.get(num, f"Input {num}")
+                for num in range(1, self.topology.inputs + 1)
+            }
+        self.input_names = input_names
+        self.output_names = {int(num): name for num, name in output_names.items()}
+        # Reverse index for source selection, and the one source list all
+        # entities share
+        self.input_numbers = {name: num for num, name in self.input_names.items()}
+        self.source_list = [self.input_names[num] for num in sorted(self.input_names)]
+
+    def set_poll_bounds(self, poll_floor: float, poll_ceiling: float) -> None:
+        """Apply new poll floor/ceiling from the options flow."""
+        self._scheduler.set_bounds(poll_floor, poll_ceiling)
+        self.update_interval = timedelta(seconds=self._scheduler.next_delay())
+
+    def _note_activity(self) -> None:
+        """Poll quickly for a while after user activity.
+        
+        Not needed once feedback is known to arrive over the session.
+        """
+        if self.client.feedback_confirmed:
+            return
+        self._scheduler.boost()
+        # Takes effect when the write is applied (async_set_updated_data
+        # reschedules the next refresh)
+        self.update_interval = timedelta(seconds=self._scheduler.next_delay())
+
+    async def _async_fetch_static_info(self) -> None:
+        """Fetch model/hostname/version and (re)discover the topology."""
+        self._static_info = await self.client.get_static_info()
+        _LOGGER.debug(f"Fetched static info: {self._static_info}")
+        topology = self._static_info["topology"]
+        if topology and topology != self.topology:
+            _LOGGER.info(f"Atlona matrix topology: {topology.inputs}x{topology.outputs}")
+            self.topology = topology
+            self.set_names(*self._names)
 
     async def _async_update_data(self):
+        now = time.monotonic()
+        previous = self.data or AtlonaState()
+        # A requested refresh or the first one polls everything
+        due = self._scheduler.due(now + DUE_TOLERANCE)
+        if self._refresh_requested or self.data is None:
+            due = set(POLL_CLASSES)
+        self._refresh_requested = False
+        if not previous.output_power:
+            due.add("output_power")
+        if not due and not self._check_version:
+            # Timer fired well ahead of the schedule: nothing to poll yet
+            self.update_interval = timedelta(seconds=self._scheduler.next_delay())
+            return previous
+        
         try:
             # Fetch static info only once
             if self._static_info is None:
-                self._static_info = await self.hass.async_add_executor_job(
-                    self.client.get_static_info
-                )
-                _LOGGER.debug(f"Fetched static info: {self._static_info}")
-            
-            # Always fetch routing status (this is the core data)
-            status = await self.hass.async_add_executor_job(
-                self.client.get_routing_status
-            )
+                await self._async_fetch_static_info()
             
-            routes = self._parse_status(status.get("status_raw", ""))
+            commands = []
+            if self._check_version:
+                # Restored static info: re-read it only if the firmware changed
+                commands.append("Version")
+            if "routes" in due:
+                commands.append("Status")  # Returns both V and A
+            if "master" in due:
+                commands.append("PWSTA")
+            if "output_power" in due:
+                commands.extend(f"x{i}$ sta" for i in self.outputs)
+            replies = dict(zip(commands, await self.client.send_batch(commands, PRIORITY_POLL)))
+            if self._check_version and replies["Version"]:
+                self._check_version = False
+                if replies["Version"].strip() != self._static_info.get("version", "").strip():
+                    _LOGGER.info("Atlona firmware changed, re-reading device info")
+                    await self._async_fetch_static_info()
             
-            # Fetch output power states every 3rd poll (every 3 minutes)
-            # or if we don't have any cached data yet
-            self._poll_count += 1
-            output_power = self.data.get("output_power_states", {}) if self.data else {}
-            
-            if self._poll_count >= 3 or not output_power:
-                self._poll_count = 0
-                power_raw = await self.hass.async_add_executor_job(
-                    self.client.get_output_power_states
-                )
-                output_power = self._parse_output_power(power_raw)
-                _LOGGER.debug(f"Refreshed output power states")
-            
-            return {
-                "status_raw": status.get("status_raw", ""),
-                "video_raw": status.get("status_raw", "").split("\n")[0] if status.get("status_raw") else "",
-                "audio_raw": status.get("status_raw", "").split("\n")[1] if status.get("status_raw") and "\n" in status.get("status_raw", "") else "",
-                "power": status.get("power", ""),
+            changes = {
                 "hostname": self._static_info.get("hostname", "").strip(),
                 "model": self._static_info.get("model", "").strip(),
                 "version": self._static_info.get("version", "").strip(),
-                "routes": routes,
-                "output_power_states": output_power,
             }
+            # A missing or unparseable reply keeps the previous value; its
+            # class backs off like an unchanged one rather than staying due
+            answered = set()
+            if "routes" in due and (routes := parse_status(replies["Status"])):
+                changes["routes"] = merge_routes(previous.routes, routes)
+                answered.add("routes")
+            if "master" in due and (power := parse_master_power(replies["PWSTA"])) is not None:
+                changes["power"] = power
+                answered.add("master")
+            if "output_power" in due:
+                power_raw = "\n".join(replies[f"x{i}$ sta"] for i in self.outputs)
+                if output_power := parse_output_power(power_raw):
+                    changes["output_power"] = {
+                        **previous.output_power,
+                        **{out: record.on for out, record in output_power.items()},
+                    }
+                    answered.add("output_power")
+                    _LOGGER.debug(f"Refreshed output power states")
+            data = previous.evolve(**changes)
+            
+            # Demote polling to slow reconciliation once feedback has been
+            # seen on this session; evolve() keeps unchanged fields, so
+            # identity means no change
+            relaxed = self.client.feedback_confirmed
+            for name, attr in (("master", "power"), ("routes", "routes"), ("output_power", "output_power")):
+                if name in answered:
+                    changed = getattr(data, attr) is not getattr(previous, attr)
+                    self._scheduler.polled(name, changed, relaxed, now)
+                elif name in due:
+                    self._scheduler.polled(name, False, now=now)
+            self.update_interval = timedelta(seconds=self._scheduler.next_delay())
+            
+            return data.polled()
+        except AtlonaUnavailableError as err:
+            # Entities go unavailable; the client probes for recovery itself
+            raise UpdateFailed(str(err)) from err
+        except AtlonaBusyError as err:
+            if self.data is None:
+                raise UpdateFailed(str(err)) from err
+            # Queue full of user commands: skip this poll, keep the state
+            _LOGGER.debug(f"Atlona poll skipped: {err} ({self.client.metrics})")
+            return self.data
         except Exception as err:
             _LOGGER.error(f"Atlona update failed: {err}")
             raise UpdateFailed(err)
@@ -0,0 +1,39 @@
+from homeassistant.core import callback
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .state import AtlonaState
+
+
+class AtlonaEntity(CoordinatorEntity):
+    """Base for Atlona entities.
+
+    Entities subscribe with their output number as listener context, so the
+    coordinator only calls back the outputs whose route/power changed (see
+    AtlonaDataUpdateCoordinator.async_update_listeners). State is computed
+    once per update into _attr_* fields by _update_attrs().
+    """
+
+    def __init__(self, coordinator, entry, output_num=None):
+        super().__init__(coordinator, context=output_num)
+        self._entry = entry
+        self._output_num = output_num
+        data = coordinator.data or AtlonaState()
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=data.hostname or "Atlona Matrix",
+            manufacturer="Atlona",
+            model=data.model or None,
+            sw_version=data.version or None,
+            configuration_url=f"http://{entry.data.get('host')}",
+        )
+        self._update_attrs()
+
+    def _update_attrs(self) -> None:
+        """Recompute _attr_* state from coordinator data."""
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._update_attrs()
+        super()._handle_coordinator_update()
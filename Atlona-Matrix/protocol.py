@@ -0,0 +1,149 @@
+"""Atlona matrix reply parser.
+
+Replies are parsed once, with precompiled patterns, into typed records. The
+parsers scan for well-formed items rather than classifying whole lines, so a
+truncated reply still yields every complete item and interleaved feedback
+lines are ignored.
+"""
+import re
+from typing import NamedTuple, Optional, Union
+
+
+class RouteRecord(NamedTuple):
+    """Current video/audio input of one output (None if unknown)."""
+
+    output: int
+    video: Optional[int]
+    audio: Optional[int]
+
+
+class PowerRecord(NamedTuple):
+    """Power state of one output."""
+
+    output: int
+    on: bool
+
+
+class RouteChange(NamedTuple):
+    """Route change feedback: one input switched to one or more outputs."""
+
+    input: int
+    outputs: tuple
+    video: bool
+    audio: bool
+
+
+class MasterPower(NamedTuple):
+    """Master power feedback (PWON/PWOFF)."""
+
+    on: bool
+
+
+class Topology(NamedTuple):
+    """Input/output count of the matrix (inputs None if unknown)."""
+
+    inputs: Optional[int]
+    outputs: int
+
+
+# One "x{in}{V|A}x{out}" item of a Status line
+_STATUS_ITEM = re.compile(r"(?<![\dA-Za-z])x(\d+)([VA])x(\d+)(?![\dA-Za-z])")
+# One "x{out}$ on|off" output power reply
+_POWER_ITEM = re.compile(r"(?<![\dA-Za-z])x(\d+)\$\s*(on|off)\b", re.IGNORECASE)
+# Master power state in a PWSTA reply (PWON/PWOFF, tolerating PON/POFF)
+_MASTER_ITEM = re.compile(r"\bPW?\s*(ON|OFF)\b", re.IGNORECASE)
+# Matrix size in a Type reply, e.g. AT-UHD-PRO3-88M (8x8), AT-PRO3HD810M (8x10)
+_MODEL_SIZE = re.compile(r"(?<!\d)(\d{2,4})M\b")
+
+# Unsolicited feedback the matrix sends when state changes (front panel, IR,
+# other control systems): route changes, output power and master power
+ROUTE_FEEDBACK = re.compile(r"^x(\d+)(AV|V|A)x(\d+(?:,x?\d+)*)$", re.IGNORECASE)
+OUTPUT_POWER_FEEDBACK = re.compile(r"^x(\d+)\$ (on|off)$", re.IGNORECASE)
+MASTER_POWER_FEEDBACK = re.compile(r"^PW(ON|OFF)$", re.IGNORECASE)
+
+_KIND = {"V": "video", "A": "audio"}
+
+
+def parse_status(raw: str) -> dict:
+    """Parse a Status reply into {output: RouteRecord}.
+    
+    Only outputs with at least one complete video or audio item are
+    returned; a missing half stays None.
+    """
+    found = {}
+    for match in _STATUS_ITEM.finditer(raw):
+        input_num, kind, output = match.groups()
+        found.setdefault(int(output), {})[_KIND[kind]] = int(input_num)
+    return {
+        output: RouteRecord(output, route.get("video"), route.get("audio"))
+        for output, route in sorted(found.items())
+    }
+
+
+def parse_output_power(raw: str) -> dict:
+    """Parse x{n}$ sta replies into {output: PowerRecord}."""
+    return {
+        int(output): PowerRecord(int(output), state.lower() == "on")
+        for output, state in _POWER_ITEM.findall(raw)
+    }
+
+
+def parse_master_power(raw: str) -> Optional[bool]:
+    """Parse a PWSTA reply: True for PWON, False for PWOFF, else None."""
+    match = _MASTER_ITEM.search(raw)
+    return match.group(1).upper() == "ON" if match else None
+
+
+def parse_feedback(line: str) -> Union[RouteChange, PowerRecord, MasterPower, None]:
+    """Parse one feedback line (or an accepted command echo)."""
+    line = line.strip()
+    if match := ROUTE_FEEDBACK.match(line):
+        input_num, kind, outputs = match.groups()
+        kind = kind.upper()
+        return RouteChange(
+            int(input_num),
+            tuple(int(out.lower().lstrip("x")) for out in outputs.split(",")),
+            "V" in kind,
+            "A" in kind,
+        )
+    if match := OUTPUT_POWER_FEEDBACK.match(line):
+        return PowerRecord(int(match.group(1)), match.group(2).lower() == "on")
+    if match := MASTER_POWER_FEEDBACK.match(line):
+        return MasterPower(match.group(1).upper() == "ON")
+    return None
+
+
+def _model_size(model: str) -> Optional[tuple]:
+    """Split the size digits of a model name into (inputs, outputs).
+    
+    "88" -> (8, 8), "810" -> (8, 10), "1616" -> (16, 16): the split with no
+    leading zeros and the most even digit count wins.
+    """
+    match = _MODEL_SIZE.search(model)
+    if not match:
+        return None
+    digits = match.group(1)
+    splits = [
+        (digits[:i], digits[i:])
+        for i in range(1, len(digits))
+        if digits[i] != "0"
+    ]
+    if not splits:
+        return None
+    inputs, outputs = min(splits, key=lambda split: abs(len(split[0]) - len(split[1])))
+    return int(inputs), int(outputs)
+
+
+def parse_topology(model: str, status: str) -> Optional[Topology]:
+    """Work out the matrix size from a Type reply and a Status reply.
+    
+    The Status line lists every output, so its width is authoritative for
+    the output count; the input count is only known from the model name.
+    """
+    size = _model_size(model)
+    routes = parse_status(status)
+    if routes:
+        return Topology(size[0] if size else None, max(routes))
+    if size:
+        return Topology(*size)
+    return None
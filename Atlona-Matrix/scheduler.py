@@ -0,0 +1,69 @@
+"""Adaptive polling schedule for the Atlona coordinator.
+
+Each data class (master power, routes, output power) keeps its own poll
+interval: it drops to the floor after user activity or a detected change and
+doubles up to the ceiling while nothing changes.
+"""
+import time
+from typing import Iterable, Optional
+
+
+class PollSchedule:
+    """Adaptive interval for one data class."""
+
+    __slots__ = ("interval", "next_due")
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_due = 0.0  # due immediately
+
+
+class AdaptiveScheduler:
+    """Tracks when each data class is next due for a poll."""
+
+    def __init__(self, classes: Iterable[str], floor: float, ceiling: float):
+        self.floor = floor
+        self.ceiling = max(floor, ceiling)
+        self._schedules = {name: PollSchedule(floor) for name in classes}
+
+    def set_bounds(self, floor: float, ceiling: float):
+        """Change the floor/ceiling (e.g. from the options flow)."""
+        self.floor = floor
+        self.ceiling = max(floor, ceiling)
+        for schedule in self._schedules.values():
+            schedule.interval = min(max(schedule.interval, self.floor), self.ceiling)
+
+    def due(self, now: Optional[float] = None) -> set:
+        """Return the data classes that should be polled now."""
+        now = time.monotonic() if now is None else now
+        return {name for name, s in self._schedules.items() if s.next_due <= now}
+
+    def polled(self, name: str, changed: bool, relaxed: bool = False, now: Optional[float] = None):
+        """Record a poll: reset to the floor on change, otherwise back off.
+        
+        `relaxed` pins an unchanged class to the ceiling (feedback is known
+        to arrive, so polling only reconciles). A change found by a poll
+        means feedback missed it, so it resets to the floor either way.
+        """
+        now = time.monotonic() if now is None else now
+        schedule = self._schedules[name]
+        if changed:
+            schedule.interval = self.floor
+        elif relaxed:
+            schedule.interval = self.ceiling
+        else:
+            schedule.interval = min(schedule.interval * 2, self.ceiling)
+        schedule.next_due = now + schedule.interval
+
+    def boost(self, names: Optional[Iterable[str]] = None, now: Optional[float] = None):
+        """Poll quickly again after user activity."""
+        now = time.monotonic() if now is None else now
+        for name in self._schedules if names is None else names:
+            schedule = self._schedules[name]
+            schedule.interval = self.floor
+            schedule.next_due = min(schedule.next_due, now + self.floor)
+
+    def next_delay(self, now: Optional[float] = None) -> float:
+        """Seconds until the next data class is due (at least 1)."""
+        now = time.monotonic() if now is None else now
+        return max(1.0, min(s.next_due for s in self._schedules.values()) - now)
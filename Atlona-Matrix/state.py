@@ -0,0 +1,105 @@
+"""Immutable snapshot of an Atlona matrix's state.
+
+Every poll, feedback line or accepted write produces a new AtlonaState.
+Maps that did not change are shared with the previous snapshot, so a poll
+that finds nothing new allocates almost nothing, and diff() only has to look
+inside maps that were actually replaced.
+"""
+import time
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from .protocol import MasterPower, PowerRecord, RouteChange, RouteRecord, parse_feedback
+
+_EMPTY = MappingProxyType({})
+
+# Fields every entity shows; a change to one of them updates everyone
+_SHARED_FIELDS = ("power", "hostname", "model", "version")
+
+
+@dataclass(frozen=True, slots=True)
+class AtlonaState:
+    """Matrix state as last seen by the coordinator.
+
+    `routes` maps output number -> RouteRecord, `output_power` maps output
+    number -> on/off. `updated_at` is when the state last changed and
+    `polled_at` when it was last confirmed by a poll (time.time()).
+    """
+
+    power: Optional[bool] = None
+    routes: Mapping[int, RouteRecord] = field(default_factory=lambda: _EMPTY)
+    output_power: Mapping[int, bool] = field(default_factory=lambda: _EMPTY)
+    hostname: str = ""
+    model: str = ""
+    version: str = ""
+    updated_at: float = 0.0
+    polled_at: float = 0.0
+
+    def route(self, output: int) -> Optional[RouteRecord]:
+        return self.routes.get(output)
+
+    def input_of(self, output: int) -> Optional[int]:
+        """Return the video input routed to an output, if known."""
+        route = self.routes.get(output)
+        return route.video if route else None
+
+    def output_on(self, output: int) -> Optional[bool]:
+        return self.output_power.get(output)
+
+    def evolve(self, **changes) -> "AtlonaState":
+        """Return the state with `changes` applied.
+
+        Values equal to the current ones are dropped, so unchanged maps stay
+        shared; with nothing left to change the same object is returned.
+        """
+        changes = {
+            key: MappingProxyType(value) if isinstance(value, dict) else value
+            for key, value in changes.items()
+            if getattr(self, key) != value
+        }
+        if not changes:
+            return self
+        return replace(self, updated_at=time.time(), **changes)
+
+    def polled(self) -> "AtlonaState":
+        """Return the state stamped as confirmed by a poll just now."""
+        return replace(self, polled_at=time.time())
+
+    def apply(self, line: str) -> Optional["AtlonaState"]:
+        """Apply a feedback line (or an accepted command echo).
+
+        Returns None if the line is not state feedback.
+        """
+        change = parse_feedback(line)
+        if isinstance(change, RouteChange):
+            routes = dict(self.routes)
+            for out in change.outputs:
+                route = routes.get(out, RouteRecord(out, None, None))
+                routes[out] = route._replace(
+                    video=change.input if change.video else route.video,
+                    audio=change.input if change.audio else route.audio,
+                )
+            return self.evolve(routes=routes)
+        if isinstance(change, PowerRecord):
+            return self.evolve(output_power={**self.output_power, change.output: change.on})
+        if isinstance(change, MasterPower):
+            return self.evolve(power=change.on)
+        return None
+
+    def diff(self, previous: Optional["AtlonaState"]) -> Optional[frozenset]:
+        """Return the outputs whose route or power differs from `previous`.
+
+        None means everything may have changed: no previous state, or a
+        change to master power or device info, which every entity shows.
+        """
+        if previous is None:
+            return None
+        if any(getattr(self, key) != getattr(previous, key) for key in _SHARED_FIELDS):
+            return None
+
+        changed = set()
+        for new, old in ((self.routes, previous.routes), (self.output_power, previous.output_power)):
+            if new is not old:
+                changed.update(out for out in new.keys() | old.keys() if new.get(out) != old.get(out))
+        return frozenset(changed)
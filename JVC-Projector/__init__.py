@@ -6,7 +6,7 @@ from homeassistant.const import CONF_HOST, CONF_PORT, CONF_PASSWORD
 from homeassistant.core import HomeAssistant
 
 from .const import DOMAIN, PLATFORMS, DEFAULT_PORT
-from .coordinator import JvcProjectorCoordinator
+from .coordinator import JvcProjectorCoordinator, static_store
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -25,7 +25,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     port = entry.data.get(CONF_PORT, DEFAULT_PORT)
     password = entry.data.get(CONF_PASSWORD, "")
 
-    coordinator = JvcProjectorCoordinator(hass, host, port, password)
+    coordinator = JvcProjectorCoordinator(hass, host, port, password, entry.entry_id)
+    await coordinator.async_restore()
     await coordinator.async_config_entry_first_refresh()
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
@@ -40,6 +41,12 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.client.disconnect()
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the saved static info of a removed entry."""
+    await static_store(hass, entry.entry_id).async_remove()
@@ -1,21 +1,58 @@
 """JVC Projector client for network communication."""
 import asyncio
 import logging
-from typing import Optional
+import time
+from typing import Any, Awaitable, Callable, Container, Dict, List, NamedTuple, Optional, Sequence
 
 from .const import (
     PJOK, PJREQ, PJACK, HEAD_OP, HEAD_REF, HEAD_RES, HEAD_ACK, END,
-    CMD_POWER, CMD_INPUT, CMD_PICTURE_MODE, CMD_MODEL, CMD_LASER_TIME,
+    CMD_NULL, CMD_POWER, CMD_INPUT, CMD_PICTURE_MODE, CMD_MODEL, CMD_LASER_TIME,
     CMD_SOFTWARE_VERSION, POWER_STATES, INPUT_SOURCES, PICTURE_MODES,
     POWER_ON, POWER_OFF, INPUT_CODES, PICTURE_MODE_CODES, DEFAULT_TIMEOUT,
-    MODEL_MAP
+    KEEPALIVE_INTERVAL, MODEL_MAP
 )
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class Frame(NamedTuple):
+    """One END-terminated frame from the projector."""
+    header: bytes         # HEAD_ACK or HEAD_RES
+    code: bytes           # Two-byte command code (e.g. PW, IP, PM, IF)
+    payload: memoryview   # Bytes between the code and END, not copied
+
+
+def parse_frame(line: bytes) -> Optional[Frame]:
+    """Split a frame read up to END into header, code and payload."""
+    if len(line) < 6 or not line.endswith(END):
+        return None
+    header = line[:3]
+    if header not in (HEAD_ACK, HEAD_RES):
+        return None
+    return Frame(header, line[3:5], memoryview(line)[5:-1])
+
+
+def _waves(cmds: Sequence[bytes]) -> List[List[bytes]]:
+    """Group queries, in order, so no wave has two with the same response code."""
+    waves: List[List[bytes]] = []
+    for cmd in cmds:
+        for wave in waves:
+            if all(other[:2] != cmd[:2] for other in wave):
+                wave.append(cmd)
+                break
+        else:
+            waves.append([cmd])
+    return waves
+
+
 class JvcProjectorClient:
-    """Client for communicating with JVC projectors."""
+    """Client for communicating with JVC projectors.
+
+    The connection is kept open between commands: a background task sends a
+    null command whenever the session has been idle for KEEPALIVE_INTERVAL,
+    and a command that finds the session dropped reconnects and retries once.
+    Call disconnect() to close the session.
+    """
 
     def __init__(self, host: str, port: int = 20554, timeout: float = DEFAULT_TIMEOUT, password: str = ""):
         self._host = host
@@ -25,11 +62,21 @@ class JvcProjectorClient:
         self._reader: Optional[asyncio.StreamReader] = None
         self._writer: Optional[asyncio.StreamWriter] = None
         self._lock = asyncio.Lock()
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._last_activity = 0.0
+        # Cleared if the projector turns out not to handle pipelined queries
+        self._pipeline = True
+        # Queries that went unanswered on a live session
+        self._unanswered = set()
 
     @property
     def host(self) -> str:
         return self._host
 
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
     async def connect(self) -> bool:
         """Establish connection to the projector."""
         try:
@@ -40,7 +87,7 @@ class JvcProjectorClient:
             
             # Wait for greeting
             response = await asyncio.wait_for(
-                self._reader.read(5),
+                self._reader.readexactly(len(PJOK)),
                 timeout=self._timeout
             )
             
@@ -58,14 +105,17 @@ class JvcProjectorClient:
                 self._writer.write(PJREQ)
             await self._writer.drain()
             
-            # Wait for acknowledgment
+            # Wait for acknowledgment (PJACK, or PJNAK on a bad password)
             response = await asyncio.wait_for(
-                self._reader.read(10),
+                self._reader.readexactly(len(PJACK)),
                 timeout=self._timeout
             )
             
             if response.startswith(PJACK):
                 _LOGGER.debug("Connected to JVC projector at %s", self._host)
+                self._last_activity = time.monotonic()
+                if self._keepalive_task is None or self._keepalive_task.done():
+                    self._keepalive_task = asyncio.get_running_loop().create_task(self._keepalive())
                 return True
             elif response.startswith(b"PJNAK"):
                 _LOGGER.error("Authentication failed - check password")
@@ -76,12 +126,23 @@ class JvcProjectorClient:
                 await self.disconnect()
                 return False
             
-        except (asyncio.TimeoutError, ConnectionRefusedError, OSError) as e:
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError) as e:
             _LOGGER.error(f"Connection failed: {e}")
+            # Don't leave a socket that never completed the handshake looking
+            # like a live session
+            await self._close_transport()
             return False
 
     async def disconnect(self):
-        """Close the connection."""
+        """Close the session and stop sending keepalives."""
+        task = self._keepalive_task
+        self._keepalive_task = None
+        if task and task is not asyncio.current_task():
+            task.cancel()
+        await self._close_transport()
+
+    async def _close_transport(self):
+        """Close the socket, leaving the keepalive task alone."""
         if self._writer:
             try:
                 self._writer.close()
@@ -91,124 +152,238 @@ class JvcProjectorClient:
         self._reader = None
         self._writer = None
 
-    async def _send_command(self, header: bytes, cmd: bytes, param: bytes = b"") -> Optional[bytes]:
-        """Send a command and return the response."""
+    async def _keepalive(self):
+        """Send a null command whenever the session has been idle too long."""
+        while True:
+            await asyncio.sleep(max(0.0, self._last_activity + KEEPALIVE_INTERVAL - time.monotonic()))
+            async with self._lock:
+                if not self.connected:
+                    return
+                if time.monotonic() - self._last_activity < KEEPALIVE_INTERVAL:
+                    continue
+                try:
+                    await self._exchange(HEAD_OP, CMD_NULL)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError) as e:
+                    # The next command reconnects and starts a new keepalive
+                    _LOGGER.debug(f"Keepalive failed, closing session: {e}")
+                    await self._close_transport()
+                    return
+
+    async def _send_command(self, header: bytes, cmd: bytes, param: bytes = b"") -> Optional[memoryview]:
+        """Send a command and return the response payload, or None on failure."""
+        return await self._with_session(lambda: self._exchange(header, cmd, param))
+
+    async def query_batch(self, cmds: Sequence[bytes]) -> Dict[bytes, Optional[memoryview]]:
+        """Send several reference commands and return {command: payload}.
+
+        Commands are written back-to-back and their responses matched by the
+        two-byte response code, so a batch costs about one round trip. A
+        payload is None if that query failed.
+        """
+        results: Dict[bytes, Optional[memoryview]] = dict.fromkeys(cmds)
+        await self._with_session(lambda: self._query_batch(results))
+        return results
+
+    async def _with_session(self, run: Callable[[], Awaitable[Any]]) -> Any:
+        """Run an exchange on the session, connecting first if needed.
+
+        If a reused session turns out to have been closed by the projector,
+        reconnect and run it once more. Returns None on failure.
+        """
         async with self._lock:
+            reused = self.connected
+            if not reused and not await self.connect():
+                return None
             try:
-                if not self._writer or self._writer.is_closing():
-                    if not await self.connect():
-                        return None
-                
-                # Build command
-                message = header + cmd + param + END
-                _LOGGER.debug(f"Sending: {message.hex()}")
-                
-                self._writer.write(message)
-                await self._writer.drain()
-                
-                # Read response - may contain ACK + response together or separately
-                response = await asyncio.wait_for(
-                    self._reader.read(100),
-                    timeout=self._timeout
-                )
-                _LOGGER.debug(f"Received: {response.hex()}")
-                
-                # Check if response contains the actual data (HEAD_RES)
-                if HEAD_RES in response:
-                    # Extract response data
-                    idx = response.find(HEAD_RES)
-                    data = response[idx + len(HEAD_RES):]
-                    if END in data:
-                        data = data[:data.find(END)]
-                    # Response prefix is always 2 bytes (e.g., PW, IP, MD, IF, PM)
-                    # regardless of command length (IFSV -> IF, PMPM -> PM)
-                    if len(data) > 2:
-                        return data[2:]
-                    return data
-                
-                # If we only got ACK, check if this is a query (reference) command
-                if HEAD_ACK in response and header == HEAD_REF:
-                    # For queries, try to read the actual response
-                    try:
-                        response2 = await asyncio.wait_for(
-                            self._reader.read(100),
-                            timeout=self._timeout
-                        )
-                        _LOGGER.debug(f"Received (2nd read): {response2.hex()}")
-                        if HEAD_RES in response2:
-                            idx = response2.find(HEAD_RES)
-                            data = response2[idx + len(HEAD_RES):]
-                            if END in data:
-                                data = data[:data.find(END)]
-                            # Response prefix is always 2 bytes
-                            if len(data) > 2:
-                                return data[2:]
-                            return data
-                    except asyncio.TimeoutError:
-                        _LOGGER.debug("No second response received")
-                        return None
-                
-                # For operation commands, ACK means success
-                if HEAD_ACK in response:
-                    return b"OK"
-                
-                return response
-                
+                return await run()
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                if not reused:
+                    _LOGGER.error(f"Command failed: {e}")
+                    await self.disconnect()
+                    return None
+                # The projector closed an idle session; reconnect and retry once
+                _LOGGER.debug(f"Session dropped ({e}), reconnecting")
+                await self._close_transport()
+                if not await self.connect():
+                    return None
             except (asyncio.TimeoutError, OSError) as e:
                 _LOGGER.error(f"Command failed: {e}")
                 await self.disconnect()
                 return None
+            try:
+                return await run()
+            except (asyncio.TimeoutError, OSError, asyncio.IncompleteReadError) as e:
+                _LOGGER.error(f"Command failed: {e}")
+                await self.disconnect()
+                return None
+
+    async def _query_batch(self, results: Dict[bytes, Optional[memoryview]]):
+        """Fill in the still-missing payloads in `results`.
+
+        Queries are sent in waves with distinct response codes (IFLT and IFSV
+        both answer as IF). Once anything in the batch has answered, the
+        session is known to be alive, so a query that times out is left None
+        instead of failing the batch. Queries a pipelined wave missed are
+        retried one at a time; only if that gets answers the wave did not is
+        the projector treated as needing strict lock-step from then on.
+        """
+        for wave in _waves([cmd for cmd, payload in results.items() if payload is None]):
+            if not self._pipeline or len(wave) == 1:
+                for cmd in wave:
+                    results[cmd] = await self._query_one(cmd, results)
+                continue
+
+            try:
+                await self._exchange_wave(wave, results)
+                continue
+            except asyncio.TimeoutError:
+                if all(payload is None for payload in results.values()):
+                    raise
+            missed = [cmd for cmd in wave if results[cmd] is None and cmd not in self._unanswered]
+            for cmd in missed:
+                results[cmd] = await self._query_one(cmd, results)
+            if any(results[cmd] is not None for cmd in missed):
+                _LOGGER.info(f"Projector at {self._host} drops pipelined queries, sending them one at a time")
+                self._pipeline = False
+
+    async def _query_one(self, cmd: bytes, results: Dict[bytes, Optional[memoryview]]) -> Optional[memoryview]:
+        """Send one query in lock-step; None if it goes unanswered on a live session."""
+        try:
+            payload = await self._exchange(HEAD_REF, cmd)
+        except asyncio.TimeoutError:
+            if all(payload is None for payload in results.values()):
+                raise
+            # The projector is answering, just not this query (unsupported
+            # on this model); don't retry it after missed pipelined waves
+            _LOGGER.debug(f"No answer to {cmd!r}, leaving it unknown")
+            self._unanswered.add(cmd)
+            return None
+        self._unanswered.discard(cmd)
+        return payload
+
+    async def _exchange_wave(self, wave: List[bytes], results: Dict[bytes, Optional[memoryview]]):
+        """Write a wave of queries at once and collect responses by code."""
+        message = b"".join(HEAD_REF + cmd + END for cmd in wave)
+        _LOGGER.debug(f"Sending: {message.hex()}")
+
+        self._writer.write(message)
+        await self._writer.drain()
+
+        pending = {cmd[:2]: cmd for cmd in wave}
+        deadline = asyncio.get_running_loop().time() + self._timeout
+        while pending:
+            frame = await self._read_frame(HEAD_RES, pending, deadline)
+            results[pending.pop(frame.code)] = frame.payload
+
+    async def _exchange(self, header: bytes, cmd: bytes, param: bytes = b"") -> memoryview:
+        """Write one command on the open session and read its reply.
+
+        Returns the response payload for a reference command, or the (empty)
+        ACK payload for an operation command.
+        """
+        message = header + cmd + param + END
+        _LOGGER.debug(f"Sending: {message.hex()}")
+
+        self._writer.write(message)
+        await self._writer.drain()
+
+        # ACK and response carry the first two bytes of the command
+        # (IFSV -> IF, PMPM -> PM), however the stream was segmented
+        code = cmd[:2]
+        deadline = asyncio.get_running_loop().time() + self._timeout
+        ack = await self._read_frame(HEAD_ACK, (code,), deadline)
+        if header != HEAD_REF:
+            return ack.payload
+        return (await self._read_frame(HEAD_RES, (code,), deadline)).payload
+
+    async def _read_frame(self, header: bytes, codes: Container[bytes], deadline: float) -> Frame:
+        """Read frames until one with the given header and one of `codes` arrives."""
+        loop = asyncio.get_running_loop()
+        while True:
+            line = await asyncio.wait_for(
+                self._reader.readuntil(END),
+                timeout=max(0.0, deadline - loop.time())
+            )
+            self._last_activity = time.monotonic()
+            frame = parse_frame(line)
+            if frame and frame.header == header and frame.code in codes:
+                _LOGGER.debug(f"Received: {line.hex()}")
+                return frame
+            if frame and frame.header == HEAD_ACK:
+                continue  # ACKs of pipelined queries carry nothing we need
+            # A late reply to an earlier, timed-out command, or line noise
+            _LOGGER.debug(f"Discarding unexpected frame: {line.hex()}")
 
     async def get_power_state(self) -> Optional[str]:
         """Get current power state."""
-        response = await self._send_command(HEAD_REF, CMD_POWER)
-        if response and response in POWER_STATES:
-            return POWER_STATES[response]
-        return None
+        return self._parse_power(await self._send_command(HEAD_REF, CMD_POWER))
 
     async def power_on(self) -> bool:
         """Turn projector on."""
         response = await self._send_command(HEAD_OP, CMD_POWER, POWER_ON)
-        return response == b"OK"
+        return response is not None
 
     async def power_off(self) -> bool:
         """Turn projector off."""
         response = await self._send_command(HEAD_OP, CMD_POWER, POWER_OFF)
-        return response == b"OK"
+        return response is not None
 
     async def get_input(self) -> Optional[str]:
         """Get current input source."""
-        response = await self._send_command(HEAD_REF, CMD_INPUT)
-        if response and response in INPUT_SOURCES:
-            return INPUT_SOURCES[response]
-        return None
+        return self._parse_input(await self._send_command(HEAD_REF, CMD_INPUT))
 
     async def set_input(self, input_name: str) -> bool:
         """Set input source."""
         if input_name in INPUT_CODES:
             response = await self._send_command(HEAD_OP, CMD_INPUT, INPUT_CODES[input_name])
-            return response == b"OK"
+            return response is not None
         return False
 
     async def get_picture_mode(self) -> Optional[str]:
         """Get current picture mode."""
-        response = await self._send_command(HEAD_REF, CMD_PICTURE_MODE)
-        if response and response in PICTURE_MODES:
-            return PICTURE_MODES[response]
-        return None
+        return self._parse_picture_mode(await self._send_command(HEAD_REF, CMD_PICTURE_MODE))
 
     async def set_picture_mode(self, mode: str) -> bool:
         """Set picture mode."""
         if mode in PICTURE_MODE_CODES:
             response = await self._send_command(HEAD_OP, CMD_PICTURE_MODE, PICTURE_MODE_CODES[mode])
-            return response == b"OK"
+            return response is not None
         return False
 
     async def get_model(self) -> Optional[str]:
         """Get projector model."""
-        response = await self._send_command(HEAD_REF, CMD_MODEL)
+        return self._parse_model(await self._send_command(HEAD_REF, CMD_MODEL))
+
+    async def get_laser_hours(self) -> Optional[int]:
+        """Get laser/lamp hours."""
+        return self._parse_laser_hours(await self._send_command(HEAD_REF, CMD_LASER_TIME))
+
+    async def get_software_version(self) -> Optional[str]:
+        """Get software version."""
+        return self._parse_software_version(await self._send_command(HEAD_REF, CMD_SOFTWARE_VERSION))
+
+    @staticmethod
+    def _parse_power(response: Optional[memoryview]) -> Optional[str]:
+        if response and response in POWER_STATES:
+            return POWER_STATES[response]
+        return None
+
+    @staticmethod
+    def _parse_input(response: Optional[memoryview]) -> Optional[str]:
+        if response and response in INPUT_SOURCES:
+            return INPUT_SOURCES[response]
+        return None
+
+    @staticmethod
+    def _parse_picture_mode(response: Optional[memoryview]) -> Optional[str]:
+        if response and response in PICTURE_MODES:
+            return PICTURE_MODES[response]
+        return None
+
+    @staticmethod
+    def _parse_model(response: Optional[memoryview]) -> Optional[str]:
         if response:
-            raw_model = response.decode("utf-8", errors="ignore").strip()
+            raw_model = bytes(response).decode("utf-8", errors="ignore").strip()
             _LOGGER.debug(f"Raw model response: {raw_model}")
             # Extract the model code (part after " -- ", e.g., "ILAFPJ -- B8A1" -> "B8A1")
             if " -- " in raw_model:
@@ -223,13 +398,12 @@ class JvcProjectorClient:
             return raw_model
         return None
 
-    async def get_laser_hours(self) -> Optional[int]:
-        """Get laser/lamp hours."""
-        response = await self._send_command(HEAD_REF, CMD_LASER_TIME)
+    @staticmethod
+    def _parse_laser_hours(response: Optional[memoryview]) -> Optional[int]:
         if response:
             try:
                 # Response is hex-encoded hours
-                hex_value = response.decode("utf-8", errors="ignore").strip()
+                hex_value = bytes(response).decode("utf-8", errors="ignore").strip()
                 _LOGGER.debug(f"Raw laser hours response: {hex_value}")
                 return int(hex_value, 16)
             except (ValueError, AttributeError) as e:
@@ -237,11 +411,10 @@ class JvcProjectorClient:
                 pass
         return None
 
-    async def get_software_version(self) -> Optional[str]:
-        """Get software version."""
-        response = await self._send_command(HEAD_REF, CMD_SOFTWARE_VERSION)
+    @staticmethod
+    def _parse_software_version(response: Optional[memoryview]) -> Optional[str]:
         if response:
-            raw_version = response.decode("utf-8", errors="ignore").strip()
+            raw_version = bytes(response).decode("utf-8", errors="ignore").strip()
             _LOGGER.debug(f"Raw firmware version: {raw_version}")
             # Extract just the numeric portion (e.g., "0200PJ" -> "0200", "0200  " -> "0200")
             version_digits = ''.join(c for c in raw_version[:4] if c.isdigit())
@@ -253,28 +426,37 @@ class JvcProjectorClient:
             return raw_version
         return None
 
-    async def get_all_status(self) -> dict:
-        """Get all status in one call."""
-        result = {
-            "power": None,
-            "input": None,
-            "picture_mode": None,
-            "model": None,
-            "laser_hours": None,
-            "software_version": None,
-        }
-        
-        result["power"] = await self.get_power_state()
-        
+    async def get_status(self, static: bool = False, slow: bool = False) -> dict:
+        """Get the live status, plus the static and/or slow properties.
+
+        Live: power, input, picture mode. Static: model, software version.
+        Slow: laser hours. Only the requested keys are returned.
+
+        Power and the other properties go out as one pipelined batch; input
+        and picture mode only answer while the projector is on, so they follow
+        in a second batch.
+        """
+        first = [CMD_POWER]
+        if static:
+            first += [CMD_MODEL, CMD_SOFTWARE_VERSION]
+        if slow:
+            first.append(CMD_LASER_TIME)
+        first = await self.query_batch(first)
+        result = {"power": self._parse_power(first[CMD_POWER]), "input": None, "picture_mode": None}
+
         # Only query other status if powered on
         if result["power"] == "on":
-            result["input"] = await self.get_input()
-            result["picture_mode"] = await self.get_picture_mode()
-        
-        # These can be queried anytime
-        result["model"] = await self.get_model()
-        result["laser_hours"] = await self.get_laser_hours()
-        result["software_version"] = await self.get_software_version()
-        
-        await self.disconnect()
+            second = await self.query_batch([CMD_INPUT, CMD_PICTURE_MODE])
+            result["input"] = self._parse_input(second[CMD_INPUT])
+            result["picture_mode"] = self._parse_picture_mode(second[CMD_PICTURE_MODE])
+
+        if static:
+            result["model"] = self._parse_model(first[CMD_MODEL])
+            result["software_version"] = self._parse_software_version(first[CMD_SOFTWARE_VERSION])
+        if slow:
+            result["laser_hours"] = self._parse_laser_hours(first[CMD_LASER_TIME])
         return result
+
+    async def get_all_status(self) -> dict:
+        """Get all status in one call."""
+        return await self.get_status(static=True, slow=True)
@@ -76,6 +76,11 @@ class JvcProjectorOptionsFlow(config_entries.OptionsFlow):
             port = user_input.get(CONF_PORT, DEFAULT_PORT)
             password = user_input.get(CONF_PASSWORD, "")
 
+            # The projector takes one session at a time; free ours for the test
+            coordinator = self.hass.data.get(DOMAIN, {}).get(self.config_entry.entry_id)
+            if coordinator:
+                await coordinator.client.disconnect()
+
             # Test connection with new settings
             client = JvcProjectorClient(host, port, password=password)
             if await client.connect():
@@ -2,6 +2,23 @@ DOMAIN = "jvc_projector"
 DEFAULT_PORT = 20554
 DEFAULT_TIMEOUT = 5.0
 
+# Polling tiers (seconds). Model and software version are static: fetched
+# once per run and saved, so entities have device info before the projector
+# answers.
+LIVE_INTERVAL = 30     # power, input, picture mode
+SLOW_INTERVAL = 3600   # laser hours
+
+# The live tier is polled every FAST_INTERVAL while warming or cooling, and
+# for POWER_COMMAND_WINDOW after a power command (the projector can take a
+# moment to leave the old state). Once stably off it drops to STANDBY_INTERVAL.
+FAST_INTERVAL = 2
+POWER_COMMAND_WINDOW = 20
+STANDBY_INTERVAL = 60
+
+# Seconds of silence before a null command is sent to keep the session open.
+# The projector drops idle connections, so this stays well inside its timeout.
+KEEPALIVE_INTERVAL = 10
+
 # JVC Protocol constants
 PJOK = b"PJ_OK"
 PJNG = b"PJ_NG"
@@ -16,6 +33,7 @@ HEAD_ACK = b"\x06" + UNIT_ID  # Acknowledgment header
 END = b"\n"
 
 # Command codes
+CMD_NULL = b"\x00\x00"  # Null command, ACKed without doing anything
 CMD_POWER = b"PW"
 CMD_INPUT = b"IP"
 CMD_PICTURE_MODE = b"PMPM"
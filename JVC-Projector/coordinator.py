@@ -1,36 +1,125 @@
 """Data coordinator for JVC Projector."""
 import logging
+import time
 from datetime import timedelta
+from typing import Optional
 
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
 from .client import JvcProjectorClient
-from .const import DOMAIN
+from .const import (
+    DOMAIN, LIVE_INTERVAL, SLOW_INTERVAL, FAST_INTERVAL, POWER_COMMAND_WINDOW,
+    STANDBY_INTERVAL
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+
+STATIC_KEYS = ("model", "software_version")
+
+
+def static_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding an entry's static projector info."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
 
 class JvcProjectorCoordinator(DataUpdateCoordinator):
-    """Coordinator for JVC Projector data updates."""
+    """Coordinator for JVC Projector data updates.
 
-    def __init__(self, hass: HomeAssistant, host: str, port: int, password: str = ""):
+    Every update polls the live tier (power, input, picture mode). Laser
+    hours are added once per SLOW_INTERVAL, and model and software version
+    until they have been read once in this run. The update interval follows
+    the power state: fast through warm-up/cool-down and right after a power
+    command, slow in standby.
+    """
+
+    def __init__(self, hass: HomeAssistant, host: str, port: int, password: str = "",
+                 entry_id: Optional[str] = None):
         self.host = host
         self.port = port
         self.client = JvcProjectorClient(host, port, password=password)
+        self._store = static_store(hass, entry_id) if entry_id else None
+        self._static = dict.fromkeys(STATIC_KEYS)
+        self._static_due = True
+        self._slow_due = 0.0
+        self._fast_until = 0.0
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
-            update_interval=timedelta(seconds=30),
+            update_interval=timedelta(seconds=LIVE_INTERVAL),
         )
 
+    async def async_restore(self):
+        """Load the static info saved by a previous run."""
+        if self._store is None:
+            return
+        stored = await self._store.async_load()
+        if stored:
+            self._static.update({key: stored.get(key) for key in STATIC_KEYS})
+
+    async def async_set_power(self, on: bool) -> bool:
+        """Switch the projector on or off and poll fast until it settles."""
+        if on:
+            ok = await self.client.power_on()
+        else:
+            ok = await self.client.power_off()
+        if ok:
+            self._fast_until = time.monotonic() + POWER_COMMAND_WINDOW
+        await self.async_request_refresh()
+        return ok
+
+    def _next_interval(self, power: Optional[str]) -> int:
+        if power in ("warming", "cooling") or time.monotonic() < self._fast_until:
+            return FAST_INTERVAL
+        if power == "off":
+            return STANDBY_INTERVAL
+        return LIVE_INTERVAL
+
     async def _async_update_data(self) -> dict:
         """Fetch data from the projector."""
+        slow = time.monotonic() >= self._slow_due
         try:
-            data = await self.client.get_all_status()
-            _LOGGER.debug(f"JVC Projector data: {data}")
-            return data
+            status = await self.client.get_status(static=self._static_due, slow=slow)
         except Exception as err:
             _LOGGER.error(f"Error updating JVC Projector: {err}")
             raise UpdateFailed(err)
+
+        # A power reply means the projector is answering: an attempt at the
+        # other tiers counts even if a query went unanswered (not supported
+        # on this model). Only a connection failure retries on the next poll.
+        answered = status["power"] is not None
+
+        if self._static_due and answered:
+            self._static_due = False
+            static = {key: status[key] or self._static[key] for key in STATIC_KEYS}
+            if static != self._static:
+                self._static = static
+                if self._store is not None:
+                    self._store.async_delay_save(lambda: dict(self._static), SAVE_DELAY)
+
+        laser_hours = (self.data or {}).get("laser_hours")
+        if slow and answered:
+            self._slow_due = time.monotonic() + SLOW_INTERVAL
+        if status.get("laser_hours") is not None:
+            laser_hours = status["laser_hours"]
+
+        data = {
+            "power": status["power"],
+            "input": status["input"],
+            "picture_mode": status["picture_mode"],
+            "model": self._static["model"],
+            "laser_hours": laser_hours,
+            "software_version": self._static["software_version"],
+        }
+        _LOGGER.debug(f"JVC Projector data: {data}")
+
+        interval = timedelta(seconds=self._next_interval(data["power"]))
+        if interval != self.update_interval:
+            _LOGGER.debug(f"JVC Projector poll interval now {interval.total_seconds():.0f}s")
+            self.update_interval = interval
+        return data
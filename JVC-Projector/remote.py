@@ -63,10 +63,8 @@ class JvcProjectorRemote(CoordinatorEntity, RemoteEntity):
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the projector on."""
-        await self.coordinator.client.power_on()
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_set_power(True)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the projector off."""
-        await self.coordinator.client.power_off()
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_set_power(False)
@@ -51,14 +51,8 @@ class JvcPowerSwitch(CoordinatorEntity, SwitchEntity):
 
     async def async_turn_on(self, **kwargs):
         """Turn the projector on."""
-        await self.coordinator.client.connect()
-        await self.coordinator.client.power_on()
-        await self.coordinator.client.disconnect()
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_set_power(True)
 
     async def async_turn_off(self, **kwargs):
         """Turn the projector off."""
-        await self.coordinator.client.connect()
-        await self.coordinator.client.power_off()
-        await self.coordinator.client.disconnect()
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_set_power(False)